@@ -8,7 +8,7 @@ from alembic import context
 # 导入我们的配置和模型
 from app.config import settings
 from app.database import Base
-from app.models import Story  # 导入所有模型，确保 Alembic 能发现它们
+from app.models import CrawlLease, FailedFetch, Story  # 导入所有模型，确保 Alembic 能发现它们
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
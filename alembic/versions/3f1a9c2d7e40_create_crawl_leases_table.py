@@ -0,0 +1,43 @@
+"""create crawl_leases table
+
+Revision ID: 3f1a9c2d7e40
+Revises: b6cf31523cb9
+Create Date: 2026-10-19 10:12:03.418221
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3f1a9c2d7e40'
+down_revision: Union[str, Sequence[str], None] = 'b6cf31523cb9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('crawl_leases',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job', sa.String(length=50), nullable=False),
+    sa.Column('start_id', sa.Integer(), nullable=False),
+    sa.Column('end_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('worker_id', sa.String(length=100), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('cursor_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job', 'start_id', name='uq_lease_job_start')
+    )
+    op.create_index('idx_lease_claim', 'crawl_leases', ['job', 'status', 'lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_lease_claim', table_name='crawl_leases')
+    op.drop_table('crawl_leases')
@@ -0,0 +1,28 @@
+"""add matched_keywords to stories
+
+Revision ID: 5b08f3ce6d17
+Revises: e91b6d04a7f5
+Create Date: 2026-10-19 15:04:12.558930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5b08f3ce6d17'
+down_revision: Union[str, Sequence[str], None] = 'e91b6d04a7f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stories', sa.Column('matched_keywords', sa.String(length=500), nullable=True))
+    # 已有数据请执行 python -m app reclassify 补全
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('stories', 'matched_keywords')
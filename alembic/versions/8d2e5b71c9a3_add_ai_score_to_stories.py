@@ -0,0 +1,29 @@
+"""add ai_score to stories
+
+Revision ID: 8d2e5b71c9a3
+Revises: 3f1a9c2d7e40
+Create Date: 2026-10-19 11:02:47.905316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8d2e5b71c9a3'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stories', sa.Column('ai_score', sa.Float(), nullable=True))
+    op.create_index('idx_ai_relevance', 'stories', ['ai_score'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_ai_relevance', table_name='stories')
+    op.drop_column('stories', 'ai_score')
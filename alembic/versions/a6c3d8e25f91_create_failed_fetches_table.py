@@ -0,0 +1,39 @@
+"""create failed_fetches table
+
+Revision ID: a6c3d8e25f91
+Revises: 5b08f3ce6d17
+Create Date: 2026-10-19 16:11:38.027145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a6c3d8e25f91'
+down_revision: Union[str, Sequence[str], None] = '5b08f3ce6d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('failed_fetches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hn_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('next_retry_at', sa.DateTime(), nullable=True),
+    sa.Column('first_failed_at', sa.DateTime(), nullable=False),
+    sa.Column('last_failed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hn_id')
+    )
+    op.create_index('idx_failed_next_retry', 'failed_fetches', ['next_retry_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_failed_next_retry', table_name='failed_fetches')
+    op.drop_table('failed_fetches')
@@ -0,0 +1,38 @@
+"""add canonical_url to stories
+
+Revision ID: c47a0e19b5d2
+Revises: 8d2e5b71c9a3
+Create Date: 2026-10-19 11:48:20.163507
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c47a0e19b5d2'
+down_revision: Union[str, Sequence[str], None] = '8d2e5b71c9a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stories', sa.Column('canonical_url', sa.String(length=1000), nullable=True))
+    op.add_column('stories', sa.Column('url_hash', sa.String(length=16), nullable=True))
+    op.add_column('stories', sa.Column('domain', sa.String(length=255), nullable=True))
+    op.add_column('stories', sa.Column('duplicate_of', sa.Integer(), nullable=True))
+    op.create_index('idx_url_hash', 'stories', ['url_hash'], unique=False)
+    op.create_index('idx_domain', 'stories', ['domain', 'is_ai_related'], unique=False)
+    # 已有数据请执行 python -m app backfill urls 补全
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_domain', table_name='stories')
+    op.drop_index('idx_url_hash', table_name='stories')
+    op.drop_column('stories', 'duplicate_of')
+    op.drop_column('stories', 'domain')
+    op.drop_column('stories', 'url_hash')
+    op.drop_column('stories', 'canonical_url')
@@ -0,0 +1,27 @@
+"""add updated_at index to stories
+
+Revision ID: d3f7a15c82e4
+Revises: a6c3d8e25f91
+Create Date: 2026-10-19 18:42:07.316502
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd3f7a15c82e4'
+down_revision: Union[str, Sequence[str], None] = 'a6c3d8e25f91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_updated_at', 'stories', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_updated_at', table_name='stories')
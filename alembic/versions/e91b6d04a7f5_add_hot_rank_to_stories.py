@@ -0,0 +1,29 @@
+"""add hot_rank to stories
+
+Revision ID: e91b6d04a7f5
+Revises: c47a0e19b5d2
+Create Date: 2026-10-19 13:26:51.740382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e91b6d04a7f5'
+down_revision: Union[str, Sequence[str], None] = 'c47a0e19b5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stories', sa.Column('hot_rank', sa.Float(), server_default='0', nullable=False))
+    op.create_index('idx_hot_rank', 'stories', ['is_ai_related', 'hot_rank'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_hot_rank', table_name='stories')
+    op.drop_column('stories', 'hot_rank')
@@ -0,0 +1,7 @@
+"""python -m app：统一命令行入口（hn-crawler）"""
+
+import sys
+
+from app.cli import main
+
+sys.exit(main())
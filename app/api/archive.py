@@ -0,0 +1,61 @@
+"""
+Archive API 路由
+
+按需查询已归档月份的故事（从压缩归档文件读取，不回灌数据库）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.retention import MONTH_RE, list_archived_months, query_archive
+
+router = APIRouter()
+
+
+@router.get("/archive", response_model=list[dict])
+async def get_archived_months():
+    """
+    列出已归档的月份
+
+    返回（按月份倒序）:
+    - month: 月份（YYYY-MM）
+    - size_bytes: 归档文件大小
+    """
+    return list_archived_months()
+
+
+@router.get("/archive/{month}", response_model=dict)
+async def get_archived_stories(
+    month: str,
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    ai_only: bool = Query(True, description="只返回 AI 相关"),
+    min_score: Optional[int] = Query(None, ge=0, description="最低分数"),
+):
+    """
+    获取某个归档月份的故事（分页，按分数降序）
+
+    参数:
+    - month: 月份（YYYY-MM）
+    - page / size / ai_only / min_score: 同 /api/stories
+    """
+    if not MONTH_RE.match(month):
+        raise HTTPException(status_code=422, detail="month 格式应为 YYYY-MM")
+
+    # 解压和解析在线程中执行，避免阻塞事件循环
+    result = await asyncio.to_thread(query_archive, month, page, size, ai_only, min_score)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Archive not found")
+
+    items, total = result
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": (total + size - 1) // size,
+    }
@@ -7,16 +7,21 @@ Stories API 路由
 from __future__ import annotations
 
 import asyncio
-from typing import Optional
+from datetime import datetime
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import Integer, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, exists, func, or_, select
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import AsyncSessionLocal
-from app.models import Story
-from app.schemas import StoryInDB
-from app.services.crawler import HNScraper, save_to_database, save_to_json
+from app.models import FailedFetch, Story
+from app.schemas import FailedFetchInDB, StoryBatchRequest, StoryInDB
+from app.services.broadcast import broadcaster
+from app.services.hotset import hot_set
 
 router = APIRouter()
 
@@ -27,12 +32,31 @@ async def get_db():
         yield session
 
 
+def _to_local_naive(value: datetime | None) -> datetime | None:
+    """
+    带时区的时间转换为本地 naive 时间
+
+    posted_at 由 datetime.fromtimestamp 写入，是不带时区的本地时间；
+    客户端传入的 ISO 时间（如 Date.toISOString() 的 ...Z）需要先换算，
+    否则 SQLite 上时间窗口会偏移，asyncpg 也会拒绝带时区的值。
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
 @router.get("/stories", response_model=dict)
 async def get_stories(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
     ai_only: bool = Query(True, description="只返回 AI 相关"),
     min_score: Optional[int] = Query(None, ge=0, description="最低分数"),
+    sort: Literal["hot", "new", "top"] = Query("top", description="排序：hot 热度 / new 最新 / top 分数"),
+    since: Optional[datetime] = Query(None, description="发布时间下限（含）"),
+    until: Optional[datetime] = Query(None, description="发布时间上限（不含）"),
+    min_ai_score: Optional[float] = Query(None, ge=0, le=1, description="最低 AI 相关度评分"),
+    domain: Optional[str] = Query(None, max_length=255, description="按域名筛选"),
+    collapse_duplicates: bool = Query(False, description="折叠重复提交，只返回主条目"),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -43,7 +67,37 @@ async def get_stories(
     - size: 每页数量（1-100）
     - ai_only: 是否只返回 AI 相关故事
     - min_score: 最低分数筛选
+    - sort: hot（hot_rank 降序）/ new（发布时间降序）/ top（分数降序）
+    - since / until: 发布时间范围（走 idx_posted_at 索引；不带时区按服务器本地时间处理）
+    - min_ai_score: 最低 AI 相关度评分（0-1）筛选
+    - domain: 按域名筛选
+    - collapse_duplicates: 折叠同一规范化 URL 的重复提交（ai_only 时在 AI 故事内折叠）
+
+    "AI 故事按分数降序"的前几页（可带 min_score）直接由内存热门集合回答。
     """
+    if (
+        ai_only
+        and sort == "top"
+        and since is None
+        and until is None
+        and min_ai_score is None
+        and not domain
+        and not collapse_duplicates
+    ):
+        cached = await hot_set.query(page, size, min_score)
+        if cached is not None:
+            items, total = cached
+            return {
+                "items": [StoryInDB.model_validate(story) for story in items],
+                "total": total,
+                "page": page,
+                "size": size,
+                "pages": (total + size - 1) // size,
+            }
+
+    since = _to_local_naive(since)
+    until = _to_local_naive(until)
+
     # 构建查询
     query = select(Story)
 
@@ -53,8 +107,43 @@ async def get_stories(
     if min_score is not None:
         query = query.where(Story.score >= min_score)
 
-    # 按分数降序
-    query = query.order_by(Story.score.desc())
+    if since is not None:
+        query = query.where(Story.posted_at >= since)
+
+    if until is not None:
+        query = query.where(Story.posted_at < until)
+
+    if min_ai_score is not None:
+        query = query.where(Story.ai_score >= min_ai_score)
+
+    if domain:
+        query = query.where(Story.domain == domain.lower())
+
+    if collapse_duplicates:
+        if ai_only:
+            # 主条目可能是非 AI 的提交，只在 AI 故事内折叠：没有更早的同 URL AI 故事（走 idx_url_hash）
+            earlier = aliased(Story)
+            query = query.where(
+                or_(
+                    Story.url_hash.is_(None),
+                    ~exists().where(
+                        earlier.url_hash == Story.url_hash,
+                        earlier.is_ai_related == True,
+                        earlier.id < Story.id,
+                    ),
+                )
+            )
+        else:
+            query = query.where(Story.duplicate_of.is_(None))
+
+    # 排序（hot / new / top 分别对应 idx_hot_rank / idx_posted_at / idx_ai_score 索引）
+    order_by = {
+        "hot": Story.hot_rank.desc(),
+        "new": Story.posted_at.desc(),
+        "top": Story.score.desc(),
+    }[sort]
+    # id 作为次级排序，保证与热门集合的顺序一致
+    query = query.order_by(order_by, Story.id.desc())
 
     # 获取总数
     count_query = select(func.count()).select_from(query.subquery())
@@ -78,6 +167,81 @@ async def get_stories(
     }
 
 
+@router.get("/stories/stream")
+async def stream_stories(request: Request):
+    """
+    实时推送新增/变化的故事（Server-Sent Events）
+
+    每次入库提交后推送一条 stories 事件：{"added": [...], "updated": [...]}。
+    其他进程（CLI 爬取、回填 worker）写入的变化在一个心跳间隔内推送；
+    变化太多时推送 refresh 事件，客户端应重新拉取列表。
+    客户端消费过慢时会收到 dropped 事件并被断开，应重新拉取列表后重连。
+    """
+    subscriber = broadcaster.subscribe()
+    broadcaster.start_watcher()
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.stream_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                if message is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                yield message
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/stories/batch", response_model=dict)
+async def get_stories_batch(
+    request: StoryBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    批量获取故事
+
+    一次 IN 查询（走主键或 hn_id 唯一索引）取回最多 500 条，结果按请求顺序返回。
+
+    请求体:
+    - ids: ID 列表
+    - key: id（数据库主键）或 hn_id（HN 原始 ID）
+    - fields: 只返回指定字段（默认全部）
+
+    返回:
+    - items: 找到的故事（按请求顺序，重复 ID 只返回一次）
+    - missing: 未找到的 ID
+    """
+    fields = request.fields or list(StoryInDB.model_fields)
+    key_column = getattr(Story, request.key)
+    columns = [getattr(Story, name) for name in dict.fromkeys([request.key, *fields])]
+
+    ids = list(dict.fromkeys(request.ids))
+    stmt = select(*columns).where(key_column.in_(ids))
+    result = await db.execute(stmt)
+    found = {getattr(row, request.key): row for row in result.all()}
+
+    return {
+        "items": [{name: getattr(found[i], name) for name in fields} for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    }
+
+
 @router.get("/stories/{story_id}", response_model=StoryInDB)
 async def get_story(
     story_id: int,
@@ -99,6 +263,79 @@ async def get_story(
     return StoryInDB.model_validate(story)
 
 
+@router.get("/stories/{story_id}/duplicates", response_model=list[StoryInDB])
+async def get_story_duplicates(
+    story_id: int,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    获取同一规范化 URL 下的所有提交（包括自身，按提交时间排序）
+
+    参数:
+    - story_id: 故事 ID（数据库主键）
+    """
+    stmt = select(Story.url_hash).where(Story.id == story_id)
+    result = await db.execute(stmt)
+    row = result.one_or_none()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Story not found")
+
+    if row.url_hash is None:
+        stmt = select(Story).where(Story.id == story_id)
+    else:
+        stmt = select(Story).where(Story.url_hash == row.url_hash).order_by(Story.posted_at)
+
+    result = await db.execute(stmt)
+    return [StoryInDB.model_validate(story) for story in result.scalars().all()]
+
+
+@router.get("/domains", response_model=list[dict])
+async def get_domains(
+    limit: int = Query(50, ge=1, le=500, description="返回数量"),
+    ai_only: bool = Query(True, description="只统计 AI 相关"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    按域名聚合（走 idx_domain 索引）
+
+    返回（按故事数降序）:
+    - domain: 域名
+    - stories: 提交数
+    - unique_urls: 去重后的文章数
+    - total_score / top_score: 总分数 / 最高分数
+    """
+    stmt = (
+        select(
+            Story.domain,
+            func.count(Story.id).label("stories"),
+            func.count(func.distinct(Story.url_hash)).label("unique_urls"),
+            func.sum(Story.score).label("total_score"),
+            func.max(Story.score).label("top_score"),
+        )
+        .where(Story.domain.is_not(None))
+        .group_by(Story.domain)
+        .order_by(func.count(Story.id).desc())
+        .limit(limit)
+    )
+
+    if ai_only:
+        stmt = stmt.where(Story.is_ai_related == True)
+
+    result = await db.execute(stmt)
+
+    return [
+        {
+            "domain": row.domain,
+            "stories": row.stories,
+            "unique_urls": row.unique_urls,
+            "total_score": row.total_score or 0,
+            "top_score": row.top_score or 0,
+        }
+        for row in result.all()
+    ]
+
+
 @router.get("/stats", response_model=dict)
 async def get_stats(db: AsyncSession = Depends(get_db)):
     """
@@ -141,14 +378,13 @@ async def trigger_crawl():
 
     这是一个后台任务，会立即返回，爬取在后台进行。
     """
+    # 延迟导入：爬虫依赖（httpx、tenacity、numpy）只在触发爬取时加载
+    from app.services.crawler import crawl_and_save
 
     async def run_crawler():
         """后台运行爬虫"""
-        with HNScraper() as scraper:
-            stories = scraper.crawl()
-            added, updated = await save_to_database(stories)
-            save_to_json(stories)
-            return {"added": added, "updated": updated, "total": len(stories)}
+        stories, added, updated = await crawl_and_save()
+        return {"added": added, "updated": updated, "total": len(stories)}
 
     # 启动后台任务
     asyncio.create_task(run_crawler())
@@ -157,3 +393,47 @@ async def trigger_crawl():
         "message": "爬取任务已启动",
         "status": "running",
     }
+
+
+@router.get("/crawl/failures", response_model=dict)
+async def get_crawl_failures(
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(50, ge=1, le=200, description="每页数量"),
+    due_only: bool = Query(False, description="只返回已到期待重试的"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    查看抓取失败重试队列
+
+    返回:
+    - total: 队列中的记录数
+    - due: 已到期待重试的数量
+    - gave_up: 超过最大重试次数、已放弃的数量
+    - items: 记录列表（按下次重试时间排序，已放弃的排在最后）
+    """
+    now = datetime.now()
+
+    stmt = select(
+        func.count(FailedFetch.id).label("total"),
+        func.sum(func.cast(FailedFetch.next_retry_at <= now, Integer)).label("due"),
+        func.sum(func.cast(FailedFetch.next_retry_at.is_(None), Integer)).label("gave_up"),
+    )
+    result = await db.execute(stmt)
+    summary = result.one()
+
+    query = select(FailedFetch)
+    if due_only:
+        query = query.where(FailedFetch.next_retry_at <= now)
+    query = query.order_by(FailedFetch.next_retry_at.is_(None), FailedFetch.next_retry_at, FailedFetch.id)
+
+    offset = (page - 1) * size
+    result = await db.execute(query.offset(offset).limit(size))
+
+    return {
+        "total": summary.total or 0,
+        "due": summary.due or 0,
+        "gave_up": summary.gave_up or 0,
+        "items": [FailedFetchInDB.model_validate(row) for row in result.scalars().all()],
+        "page": page,
+        "size": size,
+    }
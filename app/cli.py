@@ -0,0 +1,295 @@
+"""
+统一命令行入口：hn-crawler
+
+用法：python -m app <子命令> [参数]
+
+子命令：
+- crawl       爬取热门故事并入库
+- backfill    多进程分片回填（plan / work）以及已有数据的字段补全
+- export      导出数据为 JSON / CSV
+- reclassify  按当前 ai_keywords 库内重新分类，并重新计算 AI 相关度评分
+- archive     归档过期故事并压缩数据库
+- bench       性能基准（启动时间、评分吞吐、热门集合）
+
+本模块只依赖标准库，各子命令用到的模块（SQLAlchemy、httpx、numpy、配置等）
+都在执行时才导入，保证 --help 之类的轻量命令启动足够快，适合 cron 和短生命周期容器。
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+PROG = "hn-crawler"
+
+# `--help` 的启动时间预算（毫秒）
+STARTUP_BUDGET_MS = 100
+
+
+def _setup() -> None:
+    """执行实际命令前再加载配置并初始化日志"""
+    from app.config import setup_logging
+
+    setup_logging()
+
+
+def cmd_crawl(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from app.services.crawler import run_crawler, run_crawler_async
+
+    if args.json_only:
+        run_crawler()
+    else:
+        asyncio.run(run_crawler_async())
+    return 0
+
+
+def cmd_backfill(args: argparse.Namespace) -> int:
+    import asyncio
+
+    if args.target == "plan":
+        from app.services.crawler import HNScraper
+        from app.services.workers import plan_shards, reset_failed_shards, shard_status
+
+        if args.retry_failed:
+            asyncio.run(reset_failed_shards(args.job))
+
+        end = args.end
+        if end is None:
+            with HNScraper() as scraper:
+                end = scraper.fetch_max_item() + 1
+        asyncio.run(plan_shards(args.start, end, job=args.job))
+
+        status = asyncio.run(shard_status(args.job))
+        print(f"任务 {args.job} 分片状态: " + ", ".join(f"{k}={v}" for k, v in sorted(status.items())))
+
+    elif args.target == "work":
+        from app.services.workers import run_worker
+
+        stats = asyncio.run(run_worker(args.job, max_shards=args.max_shards))
+        print(stats)
+
+    elif args.target == "urls":
+        from app.services.urls import backfill_url_fields
+
+        asyncio.run(backfill_url_fields())
+
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from app.services.exporter import export_stories
+
+    total = asyncio.run(export_stories(args.output, fmt=args.format, ai_only=args.ai_only))
+    print(f"已导出 {total} 条到 {args.output}")
+    return 0
+
+
+def cmd_reclassify(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from app.services.reclassify import reclassify_stories
+
+    changed = asyncio.run(reclassify_stories())
+    print(f"重新分类完成，{changed} 条发生变化")
+
+    if args.skip_score:
+        return 0
+
+    from app.services.scoring import rescore_stories, train_from_database
+
+    scorer = asyncio.run(train_from_database()) if args.train else None
+    total = asyncio.run(rescore_stories(scorer))
+    print(f"已重新评分 {total} 条")
+    return 0
+
+
+def cmd_archive(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from app.services.retention import archive_stories
+
+    result = asyncio.run(archive_stories(compact=not args.no_compact))
+    print(f"已归档 {result['archived']} 条，涉及月份: {', '.join(result['months']) or '无'}")
+    return 0
+
+
+def _bench_startup(runs: int, budget_ms: float) -> int:
+    """测量 `--help` 的冷启动时间（独立子进程，包含解释器启动）"""
+    import statistics
+    import subprocess
+    import time
+
+    def measure(cmd: list[str]) -> float:
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    baseline = measure([sys.executable, "-c", "pass"])
+    median = measure([sys.executable, "-m", "app", "--help"])
+    print(
+        f"startup --help: median {median:.1f} ms "
+        f"(interpreter {baseline:.1f} ms, cli {median - baseline:.1f} ms), budget {budget_ms:.0f} ms"
+    )
+    return 0 if median <= budget_ms else 1
+
+
+def _bench_score(rows: int) -> int:
+    """测量批量评分吞吐"""
+    import random
+    import time
+
+    from app.services.scoring import get_scorer
+
+    words = "the a new show hn ask for with in of rust python llm gpt model open source data".split()
+    titles = [" ".join(random.choices(words, k=8)) for _ in range(rows)]
+    urls = [f"https://example{i % 100}.com/post" for i in range(rows)]
+
+    scorer = get_scorer()
+    start = time.perf_counter()
+    scorer.score(titles, urls)
+    elapsed = time.perf_counter() - start
+    print(f"score: {rows} rows in {elapsed:.2f} s ({rows / elapsed:,.0f} rows/s)")
+    return 0
+
+
+def _bench_hotset(size: int, requests: int) -> int:
+    """测量热门集合快照的内存占用和查询延迟（使用合成数据，不访问数据库）"""
+    import random
+    import time
+    import tracemalloc
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    from app.schemas import StoryInDB
+    from app.services.hotset import HotSnapshot, HotStory
+
+    now = datetime.now()
+    tracemalloc.start()
+
+    # 用生成器逐条构造，统计的内存包含快照持有的字符串等全部对象；
+    # 先按 StoryInDB 的字段全部置空，新增字段后基准不会因缺少属性而失败
+    rows = (
+        SimpleNamespace(
+            **{
+                **dict.fromkeys(StoryInDB.model_fields),
+                "id": i,
+                "hn_id": 40_000_000 + i,
+                "title": f"Show HN: an open source LLM toolkit number {i}",
+                "url": f"https://example{i % 500}.com/posts/{i}",
+                "canonical_url": f"https://example{i % 500}.com/posts/{i}",
+                "url_hash": f"{i:016x}",
+                "domain": f"example{i % 500}.com",
+                "duplicate_of": None,
+                "author": f"user{i % 1000}",
+                "score": size * 2 - i,
+                "comments_count": random.randint(0, 500),
+                "hot_rank": random.random(),
+                "posted_at": now,
+                "is_ai_related": True,
+                "matched_keywords": "llm",
+                "ai_score": random.random(),
+                "hn_url": f"https://news.ycombinator.com/item?id={40_000_000 + i}",
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        for i in range(size)
+    )
+    snapshot = HotSnapshot([HotStory(row) for row in rows], ai_total=size * 10)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"hotset: {size} stories, {memory / 1024 / 1024:.1f} MiB ({memory / size:.0f} B/story)")
+
+    for label, min_score in (("page", None), ("min_score", size + size // 2)):
+        start = time.perf_counter()
+        for i in range(requests):
+            items, _ = snapshot.query(i % 5 + 1, 20, min_score)
+        lookup = (time.perf_counter() - start) / requests * 1e6
+
+        start = time.perf_counter()
+        for i in range(requests):
+            items, _ = snapshot.query(i % 5 + 1, 20, min_score)
+            [StoryInDB.model_validate(story) for story in items]
+        total = (time.perf_counter() - start) / requests * 1e6
+        print(f"  {label}: lookup {lookup:.1f} us, lookup + serialize 20 items {total:.1f} us")
+
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    if args.target == "startup":
+        return _bench_startup(args.runs, args.budget_ms)
+    if args.target == "hotset":
+        return _bench_hotset(args.size, args.requests)
+    return _bench_score(args.rows)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=PROG, description="Hacker News AI 故事爬虫")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    crawl = sub.add_parser("crawl", help="爬取热门故事并入库")
+    crawl.add_argument("--json-only", action="store_true", help="只保存 JSON，不写数据库")
+    crawl.set_defaults(func=cmd_crawl)
+
+    backfill = sub.add_parser("backfill", help="分片回填 / 字段补全")
+    backfill_sub = backfill.add_subparsers(dest="target", required=True)
+
+    plan = backfill_sub.add_parser("plan", help="规划回填分片")
+    plan.add_argument("--start", type=int, default=1, help="起始 item ID")
+    plan.add_argument("--end", type=int, default=None, help="结束 item ID（默认当前最大 ID）")
+    plan.add_argument("--job", default="backfill")
+    plan.add_argument("--retry-failed", action="store_true", help="把超过最大领取次数的 failed 分片重置为 pending")
+
+    work = backfill_sub.add_parser("work", help="领取并处理分片（每个进程一个 worker）")
+    work.add_argument("--job", default="backfill")
+    work.add_argument("--max-shards", type=int, default=None)
+
+    backfill_sub.add_parser("urls", help="为已有数据补全规范化 URL 并标记重复")
+    backfill.set_defaults(func=cmd_backfill)
+
+    export = sub.add_parser("export", help="导出数据")
+    export.add_argument("output", help="输出文件路径")
+    export.add_argument("--format", choices=("json", "csv"), default="json")
+    export.add_argument("--ai-only", action="store_true", help="只导出 AI 相关故事")
+    export.set_defaults(func=cmd_export)
+
+    reclassify = sub.add_parser("reclassify", help="按当前关键词库内重新分类并重新评分")
+    reclassify.add_argument("--train", action="store_true", help="评分前先用数据库中的标签训练模型")
+    reclassify.add_argument("--skip-score", action="store_true", help="只重新分类，不重新计算 ai_score")
+    reclassify.set_defaults(func=cmd_reclassify)
+
+    archive = sub.add_parser("archive", help="归档过期故事并压缩数据库")
+    archive.add_argument("--no-compact", action="store_true", help="跳过 VACUUM / ANALYZE")
+    archive.set_defaults(func=cmd_archive)
+
+    bench = sub.add_parser("bench", help="性能基准")
+    bench_sub = bench.add_subparsers(dest="target", required=True)
+
+    startup = bench_sub.add_parser("startup", help="测量 --help 启动时间")
+    startup.add_argument("--runs", type=int, default=10)
+    startup.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+
+    score = bench_sub.add_parser("score", help="测量批量评分吞吐")
+    score.add_argument("--rows", type=int, default=100_000)
+
+    hotset = bench_sub.add_parser("hotset", help="测量热门集合内存占用和查询延迟")
+    hotset.add_argument("--size", type=int, default=10_000)
+    hotset.add_argument("--requests", type=int, default=1000)
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command != "bench":
+        _setup()
+    return args.func(args)
@@ -5,6 +5,8 @@
 这样可以避免硬编码，方便不同环境使用不同配置。
 """
 
+import logging
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,9 +21,30 @@ class Settings(BaseSettings):
     # AI 关键词（逗号分隔）
     ai_keywords: str = "ai,artificial intelligence,machine learning,ml,deep learning,llm,gpt,openai,claude,chatgpt,neural"
 
+    reclassify_batch_size: int = 5000  # 修改关键词后库内重新分类时每批处理的主键区间
+
+    # AI 相关度评分模型（哈希 TF-IDF + 线性模型）
+    ai_scorer_path: str = "data/ai_scorer.npz"  # 训练好的模型文件，不存在时使用关键词先验模型
+    ai_score_batch_size: int = 5000  # 批量重新评分时每批处理的行数
+
     # 数据存储
     data_dir: str = "data"
 
+    # 热度排名（HN 重力公式）
+    hot_rank_gravity: float = 1.8  # 衰减指数
+    hot_rank_window_days: int = 7  # 只刷新该时间窗口内的故事，窗口外 hot_rank 置 0
+    hot_rank_batch_size: int = 5000  # 每批 UPDATE 的主键区间大小
+
+    # 首页热门集合（进程内缓存分数最高的 AI 故事）
+    hot_set_size: int = 10000  # 缓存条数，0 表示关闭
+    hot_set_max_age_seconds: int = 60  # 最长缓存时间（兜底其他进程写入的数据）
+
+    # 数据保留与归档
+    retention_days: int = 365  # 超过该天数的故事归档
+    retention_non_ai_days: int = 30  # 非 AI 故事更早归档
+    archive_dir: str = "data/archive"  # 按月压缩归档文件目录
+    retention_batch_size: int = 1000  # 每批归档/删除的行数
+
     # 日志级别
     log_level: str = "INFO"
 
@@ -30,6 +53,24 @@ class Settings(BaseSettings):
     sync_database_url: str = "sqlite:///./data/hackernews.db"  # 同步 URL（Alembic 使用）
     db_echo: bool = False  # 是否打印 SQL 语句
 
+    # 实时推送（SSE）
+    stream_queue_size: int = 16  # 每个客户端最多积压的消息数，超过即断开
+    stream_keepalive_seconds: int = 15  # 心跳注释间隔，防止代理断开空闲连接
+    stream_poll_limit: int = 500  # 每次轮询其他进程的变更最多推送的条数，超过时推送 refresh
+
+    # 抓取失败重试队列（指数退避）
+    retry_base_seconds: int = 60  # 第一次重试的等待时间，之后每次翻倍
+    retry_max_seconds: int = 86400  # 单次等待上限
+    retry_max_attempts: int = 8  # 超过该次数后放弃
+    retry_batch_size: int = 50  # 每次爬取顺带重试的数量
+
+    # 多进程分片爬取（worker 通过数据库租约表协调）
+    worker_shard_size: int = 1000  # 每个分片包含的 HN item ID 数量
+    worker_lease_seconds: int = 120  # 租约有效期，超时未续约视为 worker 已退出
+    worker_heartbeat_interval: int = 30  # 心跳续约间隔（秒）
+    worker_batch_size: int = 100  # 每批写入数据库的故事数
+    worker_max_attempts: int = 5  # 分片最多领取次数，超过后标记为 failed 不再领取
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -38,9 +79,17 @@ class Settings(BaseSettings):
 
     @property
     def ai_keywords_list(self) -> list[str]:
-        """将逗号分隔的关键词转为列表"""
-        return [kw.strip().lower() for kw in self.ai_keywords.split(",")]
+        """将逗号分隔的关键词转为列表（忽略空项，如结尾多余的逗号）"""
+        return [kw for kw in (kw.strip().lower() for kw in self.ai_keywords.split(",")) if kw]
 
 
 # 全局配置实例（单例模式）
 settings = Settings()
+
+
+def setup_logging() -> None:
+    """配置日志（由入口调用，导入模块时不再产生副作用）"""
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level),
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
@@ -7,6 +7,9 @@
 
 from __future__ import annotations
 
+import math
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -20,6 +23,21 @@ engine = create_async_engine(
     future=True,
 )
 
+
+def _unicode_lower(value: str | None) -> str | None:
+    return value.lower() if value is not None else None
+
+
+# SQLite 不一定编译了数学函数，注册 power() 供 hot_rank 计算使用；
+# SQLite 内置的 lower() 只转换 ASCII 字母，注册 unicode_lower() 与 Python 的 str.lower() 保持一致
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _register_sqlite_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("power", 2, math.pow, deterministic=True)
+        dbapi_connection.create_function("unicode_lower", 1, _unicode_lower, deterministic=True)
+
+
 # 会话工厂
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -11,8 +11,10 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import stories
-from app.config import settings
+from app.api import archive, stories
+from app.config import settings, setup_logging
+
+setup_logging()
 
 
 @asynccontextmanager
@@ -44,6 +46,7 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(stories.router, prefix="/api", tags=["Stories"])
+app.include_router(archive.router, prefix="/api", tags=["Archive"])
 
 
 @app.get("/", tags=["Root"])
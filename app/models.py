@@ -9,7 +9,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Integer, Boolean, Index, func
+from sqlalchemy import String, Integer, Boolean, Float, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -29,11 +29,15 @@ class Story(Base):
     # 基本信息
     title: Mapped[str] = mapped_column(String(500), nullable=False)
     url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    canonical_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)  # 规范化 URL
+    url_hash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)  # 规范化 URL 哈希（去重用）
+    domain: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # 域名
     author: Mapped[str] = mapped_column(String(100), nullable=False)
 
     # 统计信息
     score: Mapped[int] = mapped_column(Integer, default=0)
     comments_count: Mapped[int] = mapped_column(Integer, default=0)
+    hot_rank: Mapped[float] = mapped_column(Float, default=0, nullable=False)  # 热度排名（随时间衰减）
 
     # 时间信息
     posted_at: Mapped[datetime] = mapped_column(nullable=False)  # HN 发布时间
@@ -46,6 +50,11 @@ class Story(Base):
 
     # 分类标记
     is_ai_related: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    matched_keywords: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)  # 命中的关键词（逗号分隔）
+    ai_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # AI 相关度评分 0-1
+
+    # 重复标记：指向同一规范化 URL 下最早入库故事的 hn_id，主条目为空
+    duplicate_of: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     # HN 讨论链接
     hn_url: Mapped[str] = mapped_column(String(200), nullable=False)
@@ -54,7 +63,78 @@ class Story(Base):
     __table_args__ = (
         Index("idx_ai_score", "is_ai_related", "score"),  # AI 故事按分数查询
         Index("idx_posted_at", "posted_at"),  # 按发布时间查询
+        Index("idx_hot_rank", "is_ai_related", "hot_rank"),  # 按热度排序
+        Index("idx_ai_relevance", "ai_score"),  # 按相关度阈值筛选
+        Index("idx_url_hash", "url_hash"),  # 重复检测
+        Index("idx_domain", "domain", "is_ai_related"),  # 域名聚合
+        Index("idx_updated_at", "updated_at"),  # 检测其他进程写入的变更
     )
 
     def __repr__(self) -> str:
         return f"<Story(hn_id={self.hn_id}, title={self.title[:30]}...)>"
+
+
+class CrawlLease(Base):
+    """分片爬取租约（多 worker 通过该表协调）"""
+
+    __tablename__ = "crawl_leases"
+
+    # 主键
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # 任务名 + 分片 ID 区间 [start_id, end_id)
+    job: Mapped[str] = mapped_column(String(50), nullable=False)
+    start_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    end_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # 状态：pending / running / done / failed（领取次数超过 worker_max_attempts）
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+
+    # 租约信息
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+    # 进度（已处理到的 ID，worker 退出后由下一个 worker 接着处理）
+    cursor_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint("job", "start_id", name="uq_lease_job_start"),
+        Index("idx_lease_claim", "job", "status", "lease_expires_at"),  # 领取分片查询
+    )
+
+    def __repr__(self) -> str:
+        return f"<CrawlLease(job={self.job}, range=[{self.start_id}, {self.end_id}), status={self.status})>"
+
+
+class FailedFetch(Base):
+    """抓取失败的 item（持久化重试队列）"""
+
+    __tablename__ = "failed_fetches"
+
+    # 主键
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # HN item ID（唯一，同一 item 只排队一次）
+    hn_id: Mapped[int] = mapped_column(Integer, unique=True, nullable=False)
+
+    # 重试信息
+    attempts: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    next_retry_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)  # 为空表示已放弃
+
+    # 时间信息
+    first_failed_at: Mapped[datetime] = mapped_column(default=func.now(), nullable=False)
+    last_failed_at: Mapped[datetime] = mapped_column(default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_failed_next_retry", "next_retry_at"),  # 取出到期的重试
+    )
+
+    def __repr__(self) -> str:
+        return f"<FailedFetch(hn_id={self.hn_id}, attempts={self.attempts})>"
@@ -7,9 +7,9 @@ Pydantic 模型定义
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 
 
 class StoryBase(BaseModel):
@@ -18,11 +18,18 @@ class StoryBase(BaseModel):
     hn_id: int = Field(..., description="HN 原始 ID")
     title: str = Field(..., max_length=500, description="故事标题")
     url: Optional[str] = Field(None, max_length=1000, description="原文链接")
+    canonical_url: Optional[str] = Field(None, max_length=1000, description="规范化链接")
+    url_hash: Optional[str] = Field(None, max_length=16, description="规范化链接哈希（相同即为重复）")
+    domain: Optional[str] = Field(None, max_length=255, description="域名")
+    duplicate_of: Optional[int] = Field(None, description="重复时指向主条目的 hn_id")
     author: str = Field(..., max_length=100, description="作者")
     score: int = Field(default=0, ge=0, description="热度分数")
     comments_count: int = Field(default=0, ge=0, description="评论数")
+    hot_rank: float = Field(default=0, description="热度排名分（分数随发布时间衰减）")
     posted_at: datetime = Field(..., description="HN 发布时间")
     is_ai_related: bool = Field(default=False, description="是否 AI 相关")
+    matched_keywords: Optional[str] = Field(None, max_length=500, description="命中的 AI 关键词（逗号分隔）")
+    ai_score: Optional[float] = Field(None, ge=0, le=1, description="AI 相关度评分")
     hn_url: str = Field(..., max_length=200, description="HN 讨论链接")
 
 
@@ -47,3 +54,37 @@ class StoryInDB(StoryBase):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)  # 允许从 ORM 对象创建
+
+
+# 批量查询单次最多的 ID 数量
+BATCH_MAX_IDS = 500
+
+
+class StoryBatchRequest(BaseModel):
+    """批量查询 Story"""
+
+    ids: list[int] = Field(..., min_length=1, max_length=BATCH_MAX_IDS, description="ID 列表")
+    key: Literal["id", "hn_id"] = Field(default="id", description="ids 的类型：数据库主键或 HN 原始 ID")
+    fields: Optional[list[str]] = Field(None, description="只返回指定字段（默认全部）")
+
+    @field_validator("fields")
+    @classmethod
+    def check_fields(cls, fields: Optional[list[str]]) -> Optional[list[str]]:
+        if fields is not None:
+            unknown = [f for f in fields if f not in StoryInDB.model_fields]
+            if unknown:
+                raise ValueError(f"未知字段: {', '.join(unknown)}")
+        return fields
+
+
+class FailedFetchInDB(BaseModel):
+    """重试队列中的抓取失败记录"""
+
+    hn_id: int
+    attempts: int
+    last_error: Optional[str] = None
+    next_retry_at: Optional[datetime] = Field(None, description="下次重试时间，为空表示已放弃")
+    first_failed_at: datetime
+    last_failed_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,201 @@
+"""
+故事变更广播
+
+save_to_database 提交后把新增/变化的故事发布到这里，由 SSE 接口推送给所有在线客户端，
+一次爬取只产生一次广播，而不是每个客户端各自轮询 /api/stories。
+
+- 每个客户端一个有界队列，消息在发布时只序列化一次
+- 队列满（客户端消费太慢）时直接断开该客户端，不阻塞发布方，也不无限堆积内存；
+  客户端收到 dropped 事件后应重新拉取列表再重连
+- 其他进程写入的数据（cron 中的 CLI 爬取、回填 worker）不会经过本进程的 save_to_database，
+  有订阅者时后台每个心跳间隔查询一次 max(updated_at)（走 idx_updated_at），
+  发现变化就把 updated_at 之后的行作为一条 diff 广播；变化太多时改为推送 refresh 事件，
+  客户端重新拉取列表。已经由本进程广播过的行按 (hn_id, updated_at) 去重，不会重复推送
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Story
+from app.schemas import StoryInDB
+
+logger = logging.getLogger(__name__)
+
+# 轮询窗口向前多取的时间：SQLite 的 CURRENT_TIMESTAMP 只精确到秒，
+# 同一秒内稍后提交的行 updated_at 与水位线相同，靠 _seen 去重
+_POLL_MARGIN = timedelta(seconds=1)
+
+
+class Subscriber:
+    """单个订阅者（一个 SSE 连接）"""
+
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class StoryBroadcaster:
+    """进程内扇出广播器"""
+
+    def __init__(self, queue_size: int | None = None):
+        self.queue_size = queue_size or settings.stream_queue_size
+        self._subscribers: set[Subscriber] = set()
+        # 已广播的故事 hn_id -> updated_at（只保留轮询窗口内的，用于去重）
+        self._seen: dict[int, datetime] = {}
+        # 水位线：已处理到的 updated_at（None 表示表为空）；_initialized 为 False 时需要重新确定
+        self._watermark: datetime | None = None
+        self._initialized = False
+        self._watcher: asyncio.Task | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        """注册一个订阅者"""
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        logger.debug(f"新订阅者，当前 {self.subscriber_count} 个")
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """注销订阅者"""
+        self._subscribers.discard(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        """断开消费过慢的订阅者：清空积压消息，放入结束标记"""
+        subscriber.dropped = True
+        self._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        logger.warning("订阅者队列已满，已断开")
+
+    def publish(self, event: str, data: dict) -> int:
+        """
+        发布事件（必须在事件循环线程中调用，不会阻塞）
+
+        返回：成功投递的订阅者数量
+        """
+        if not self._subscribers:
+            return 0
+
+        message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+        delivered = 0
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+        return delivered
+
+    def publish_stories(self, added: list[StoryInDB], updated: list[StoryInDB]) -> int:
+        """发布一条 stories diff（已广播过的同一版本不再重复推送）"""
+        added = [s for s in added if self._seen.get(s.hn_id) != s.updated_at]
+        updated = [s for s in updated if self._seen.get(s.hn_id) != s.updated_at]
+        if not added and not updated:
+            return 0
+
+        for story in (*added, *updated):
+            self._seen[story.hn_id] = story.updated_at
+
+        return self.publish(
+            "stories",
+            {
+                "added": [s.model_dump(mode="json") for s in added],
+                "updated": [s.model_dump(mode="json") for s in updated],
+            },
+        )
+
+    def start_watcher(self) -> None:
+        """启动跨进程变更轮询（已在运行时忽略；没有订阅者后自动退出）"""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self) -> None:
+        """
+        后台轮询：有订阅者期间每个心跳间隔检查一次数据库
+
+        单次轮询失败（数据库暂时不可用等）只记录日志，下一个间隔继续，
+        不会让已连接的客户端从此收不到其他进程的变更。
+        """
+        self._initialized = False
+        while self._subscribers:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("变更轮询失败")
+            await asyncio.sleep(settings.stream_keepalive_seconds)
+
+    async def _reset_watermark(self) -> None:
+        """水位线移到当前最新的 updated_at，窗口内已有的行视为已广播"""
+        async with AsyncSessionLocal() as session:
+            latest = (await session.execute(select(func.max(Story.updated_at)))).scalar()
+            self._seen.clear()
+            if latest is not None:
+                stmt = select(Story.hn_id, Story.updated_at).where(Story.updated_at > latest - _POLL_MARGIN)
+                self._seen.update((await session.execute(stmt)).tuples().all())
+        self._watermark = latest
+        self._initialized = True
+
+    async def poll(self) -> int:
+        """
+        检查其他进程提交的变更并广播
+
+        返回：推送的故事数量（推送 refresh 时为 0）
+        """
+        if not self._initialized:
+            await self._reset_watermark()
+            return 0
+
+        # 水位线为 None 表示上次轮询时表为空，之后出现的行全部是新的
+        since = self._watermark - _POLL_MARGIN if self._watermark is not None else None
+        limit = settings.stream_poll_limit
+
+        async with AsyncSessionLocal() as session:
+            latest = (await session.execute(select(func.max(Story.updated_at)))).scalar()
+            if latest is None:
+                # 表为空（如全部归档后）
+                self._watermark = None
+                return 0
+            if self._watermark is not None and latest <= self._watermark:
+                return 0
+
+            stmt = select(Story).order_by(Story.updated_at).limit(limit + 1)
+            if since is not None:
+                stmt = stmt.where(Story.updated_at > since)
+            stories = [StoryInDB.model_validate(s) for s in (await session.execute(stmt)).scalars()]
+
+        if len(stories) > limit:
+            logger.info(f"检测到超过 {limit} 条变更，通知客户端重新拉取")
+            self.publish("refresh", {})
+            await self._reset_watermark()
+            return 0
+
+        delivered = [s for s in stories if self._seen.get(s.hn_id) != s.updated_at]
+        self.publish_stories(
+            [s for s in delivered if since is None or s.created_at > since],
+            [s for s in delivered if since is not None and s.created_at <= since],
+        )
+
+        # 下一次轮询窗口之前的去重记录不会再被查到
+        self._watermark = latest
+        self._seen = {k: v for k, v in self._seen.items() if v > latest - _POLL_MARGIN}
+        return len(delivered)
+
+
+# 全局广播器实例
+broadcaster = StoryBroadcaster()
@@ -20,22 +20,33 @@ from datetime import datetime
 from typing import Optional
 
 import httpx
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from app.config import settings
-from app.database import AsyncSessionLocal
+from app.config import settings, setup_logging
+from app.database import AsyncSessionLocal, engine
 from app.models import Story
+from app.schemas import StoryInDB
+from app.services.broadcast import broadcaster
+from app.services.ranking import hot_rank, refresh_hot_rank
+from app.services.retry_queue import due_failures, flush_fetch_results
+from app.services.scoring import get_scorer
+from app.services.urls import url_fields
 
-# 配置日志
-logging.basicConfig(
-    level=getattr(logging, settings.log_level),
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
 
+def match_keywords(title: str | None, keywords: list[str]) -> list[str]:
+    """
+    返回标题命中的关键词（按关键词配置顺序）
+
+    与 reclassify 中的 SQL 版本保持一致：小写后做子串匹配。
+    """
+    title = (title or "").lower()
+    return [kw for kw in keywords if kw in title]
+
+
 class HNScraper:
     """Hacker News 爬虫"""
 
@@ -44,6 +55,10 @@ class HNScraper:
         self.timeout = settings.request_timeout
         self.client = httpx.Client(timeout=self.timeout)
 
+        # 抓取结果记录（由重试队列消费）：失败的 ID -> 错误信息，成功的 ID
+        self.failures: dict[int, str] = {}
+        self.succeeded: set[int] = set()
+
     def __enter__(self):
         return self
 
@@ -74,58 +89,87 @@ class HNScraper:
         url = f"{self.base_url}/item/{story_id}.json"
 
         try:
-            return self._get(url)
+            item = self._get(url)
         except Exception as e:
             logger.warning(f"获取故事 {story_id} 失败: {e}")
+            self.failures[story_id] = str(e) or type(e).__name__
             return None
 
-    def filter_ai_stories(self, stories: list[dict]) -> list[dict]:
-        """筛选 AI 相关故事"""
+        self.succeeded.add(story_id)
+        return item
+
+    def fetch_max_item(self) -> int:
+        """获取当前最大的 item ID（用于回填时划分分片）"""
+        url = f"{self.base_url}/maxitem.json"
+        return int(self._get(url))
+
+    @staticmethod
+    def parse_story(story_id: int, item: dict | None) -> dict | None:
+        """将 HN item 转换为故事字典，非故事或已删除的 item 返回 None"""
+        if not item or item.get("type") != "story":
+            return None
+        if item.get("deleted") or item.get("dead"):
+            return None
+
+        return {
+            "hn_id": story_id,
+            "title": item.get("title"),
+            "url": item.get("url"),
+            "score": item.get("score", 0),
+            "author": item.get("by"),
+            "posted_at": item.get("time"),
+            "comments_count": item.get("descendants", 0),
+            "hn_url": f"https://news.ycombinator.com/item?id={story_id}",
+        }
+
+    def classify_stories(self, stories: list[dict]) -> list[dict]:
+        """标记 AI 相关故事（写入 is_ai_related 和 matched_keywords）"""
         keywords = settings.ai_keywords_list
 
-        ai_stories = []
+        ai_count = 0
         for story in stories:
-            title = story.get("title", "").lower()
-            if any(kw in title for kw in keywords):
-                ai_stories.append(story)
+            matched = match_keywords(story.get("title"), keywords)
+            story["matched_keywords"] = matched
+            story["is_ai_related"] = bool(matched)
+            ai_count += bool(matched)
 
-        logger.info(f"筛选出 {len(ai_stories)}/{len(stories)} 个 AI 相关故事")
-        return ai_stories
+        logger.info(f"识别出 {ai_count}/{len(stories)} 个 AI 相关故事")
+        return stories
 
-    def crawl(self, limit: int | None = None) -> list[dict]:
-        """执行爬取流程"""
+    def filter_ai_stories(self, stories: list[dict]) -> list[dict]:
+        """筛选 AI 相关故事"""
+        return [story for story in self.classify_stories(stories) if story["is_ai_related"]]
+
+    def crawl(self, limit: int | None = None, retry_ids: list[int] | None = None) -> list[dict]:
+        """
+        执行爬取流程
+
+        retry_ids: 重试队列中到期的 ID，和热门列表一起抓取
+        """
         logger.info("开始爬取 Hacker News...")
 
         # 1. 获取故事 ID
         story_ids = self.fetch_top_stories(limit)
         logger.info(f"获取到 {len(story_ids)} 个故事 ID")
 
+        if retry_ids:
+            top_ids = set(story_ids)
+            story_ids = story_ids + [i for i in retry_ids if i not in top_ids]
+            logger.info(f"附带重试 {len(retry_ids)} 个之前抓取失败的 ID")
+
         # 2. 获取详情
         stories = []
         for i, story_id in enumerate(story_ids, 1):
             logger.debug(f"获取第 {i}/{len(story_ids)} 个故事...")
-            story = self.fetch_story_detail(story_id)
-
-            if story and story.get("type") == "story":
-                stories.append(
-                    {
-                        "hn_id": story_id,
-                        "title": story.get("title"),
-                        "url": story.get("url"),
-                        "score": story.get("score", 0),
-                        "author": story.get("by"),
-                        "posted_at": story.get("time"),
-                        "comments_count": story.get("descendants", 0),
-                        "hn_url": f"https://news.ycombinator.com/item?id={story_id}",
-                    }
-                )
+            story = self.parse_story(story_id, self.fetch_story_detail(story_id))
 
-        logger.info(f"成功获取 {len(stories)} 个故事详情")
+            if story:
+                stories.append(story)
 
-        # 3. 筛选 AI 相关
-        ai_stories = self.filter_ai_stories(stories)
+        logger.info(f"成功获取 {len(stories)} 个故事详情")
 
-        return ai_stories
+        # 3. 标记 AI 相关（全部故事都会入库，便于之后修改关键词重新分类）
+        return self.classify_stories(stories)
 
 
 def save_to_json(data: list[dict], filename: str | None = None) -> str:
@@ -134,7 +178,7 @@ def save_to_json(data: list[dict], filename: str | None = None) -> str:
 
     if not filename:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"hn_ai_stories_{timestamp}.json"
+        filename = f"hn_stories_{timestamp}.json"
 
     filepath = os.path.join(settings.data_dir, filename)
 
@@ -149,47 +193,140 @@ async def save_to_database(stories: list[dict]) -> tuple[int, int]:
     """
     保存故事到数据库
 
+    新增故事时按 url_hash 检测重复：同一规范化 URL 下最早入库的故事为主条目，
+    之后的故事通过 duplicate_of 指向它。
+    新故事用 INSERT ... ON CONFLICT(hn_id) DO UPDATE 写入：多个 worker 同时写入同一条故事时
+    后到的一方转为更新，不会因唯一约束冲突导致整批失败。
+    提交后把新增和有变化的故事作为一次 diff 广播给实时推送的订阅者。
     返回：(新增数量, 更新数量)
     """
     added = 0
     updated = 0
+    added_ids: list[int] = []
+    changed_ids: list[int] = []
+
+    # 未分类的故事（如直接调用本函数时）按当前关键词补充分类
+    keywords = settings.ai_keywords_list
+    for story_data in stories:
+        if "matched_keywords" not in story_data:
+            story_data["matched_keywords"] = match_keywords(story_data["title"], keywords)
+            story_data["is_ai_related"] = bool(story_data["matched_keywords"])
+
+    # 批量计算 AI 相关度评分
+    scores = get_scorer().score(
+        [s["title"] for s in stories], [s.get("url") for s in stories]
+    )
+
+    # 规范化 URL，并一次性查出已入库的主条目（走 url_hash 索引）
+    fields_list = [url_fields(s.get("url")) for s in stories]
+    hashes = {f["url_hash"] for f in fields_list if f["url_hash"]}
 
     async with AsyncSessionLocal() as session:
-        for story_data in stories:
+        primaries: dict[str, int] = {}
+        if hashes:
+            stmt = select(Story.url_hash, Story.hn_id).where(
+                Story.url_hash.in_(hashes), Story.duplicate_of.is_(None)
+            )
+            for h, hn_id in (await session.execute(stmt)).all():
+                primaries.setdefault(h, hn_id)
+
+        new_rows: dict[int, dict] = {}
+        for story_data, ai_score, fields in zip(stories, scores, fields_list):
             # 检查是否已存在
             stmt = select(Story).where(Story.hn_id == story_data["hn_id"])
             result = await session.execute(stmt)
             existing_story = result.scalar_one_or_none()
 
             if existing_story:
+                if (
+                    existing_story.score != story_data["score"]
+                    or existing_story.comments_count != story_data["comments_count"]
+                ):
+                    changed_ids.append(story_data["hn_id"])
+
                 # 更新现有记录（分数和评论数可能变化）
                 existing_story.score = story_data["score"]
                 existing_story.comments_count = story_data["comments_count"]
+                existing_story.ai_score = float(ai_score)
+                existing_story.is_ai_related = story_data["is_ai_related"]
+                existing_story.matched_keywords = ",".join(story_data["matched_keywords"]) or None
                 updated += 1
                 logger.debug(f"更新故事: {story_data['hn_id']}")
             else:
                 # 创建新记录
-                story = Story(
+                duplicate_of = None
+                if fields["url_hash"]:
+                    duplicate_of = primaries.setdefault(fields["url_hash"], story_data["hn_id"])
+                    if duplicate_of == story_data["hn_id"]:
+                        duplicate_of = None
+
+                posted_at = datetime.fromtimestamp(story_data["posted_at"])
+                if story_data["hn_id"] not in new_rows:
+                    added += 1
+                    added_ids.append(story_data["hn_id"])
+                # 同一批内重复出现的故事只保留最后一次（同一条 upsert 语句不能两次更新同一行）
+                new_rows[story_data["hn_id"]] = dict(
                     hn_id=story_data["hn_id"],
                     title=story_data["title"],
                     url=story_data.get("url"),
+                    **fields,
+                    duplicate_of=duplicate_of,
                     author=story_data["author"],
                     score=story_data["score"],
                     comments_count=story_data["comments_count"],
-                    posted_at=datetime.fromtimestamp(story_data["posted_at"]),
-                    is_ai_related=True,  # 已筛选过的都是 AI 相关
+                    posted_at=posted_at,
+                    hot_rank=hot_rank(story_data["score"], posted_at),
+                    is_ai_related=story_data["is_ai_related"],
+                    matched_keywords=",".join(story_data["matched_keywords"]) or None,
+                    ai_score=float(ai_score),
                     hn_url=story_data["hn_url"],
                 )
-                session.add(story)
-                added += 1
                 logger.debug(f"新增故事: {story_data['hn_id']}")
 
+        if new_rows:
+            await session.execute(_upsert_stmt(), list(new_rows.values()))
         await session.commit()
 
+        if (added_ids or changed_ids) and broadcaster.subscriber_count:
+            await _broadcast_changes(session, added_ids, changed_ids)
+
     logger.info(f"数据库保存完成: 新增 {added} 条, 更新 {updated} 条")
     return added, updated
 
 
+def _upsert_stmt():
+    """按 hn_id 的 upsert 语句（SQLite / PostgreSQL 方言的 ON CONFLICT）"""
+    if engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+
+    stmt = insert(Story)
+    return stmt.on_conflict_do_update(
+        index_elements=[Story.hn_id],
+        set_={
+            "score": stmt.excluded.score,
+            "comments_count": stmt.excluded.comments_count,
+            "ai_score": stmt.excluded.ai_score,
+            "is_ai_related": stmt.excluded.is_ai_related,
+            "matched_keywords": stmt.excluded.matched_keywords,
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def _broadcast_changes(session, added_ids: list[int], changed_ids: list[int]) -> None:
+    """查出本次新增/变化的故事，作为一条 diff 广播"""
+    stmt = select(Story).where(Story.hn_id.in_(added_ids + changed_ids))
+    result = await session.execute(stmt)
+    rows = {story.hn_id: StoryInDB.model_validate(story) for story in result.scalars()}
+
+    broadcaster.publish_stories(
+        [rows[i] for i in added_ids if i in rows],
+        [rows[i] for i in changed_ids if i in rows],
+    )
+
+
 def run_crawler():
     """运行爬虫的入口函数（同步版本，仅保存 JSON）"""
     with HNScraper() as scraper:
@@ -197,36 +334,62 @@ def run_crawler():
         save_to_json(stories)
 
         # 显示结果
-        print(f"\n找到 {len(stories)} 个 AI 相关故事：")
-        for story in stories[:5]:
+        ai_stories = [story for story in stories if story["is_ai_related"]]
+        print(f"\n找到 {len(ai_stories)}/{len(stories)} 个 AI 相关故事：")
+        for story in ai_stories[:5]:
             print(f"  - {story['title']} (score: {story['score']})")
 
-        if len(stories) > 5:
-            print(f"  ... 还有 {len(stories) - 5} 条")
+        if len(ai_stories) > 5:
+            print(f"  ... 还有 {len(ai_stories) - 5} 条")
 
 
-async def run_crawler_async():
-    """运行爬虫的入口函数（异步版本，保存到数据库）"""
+async def crawl_and_save(limit: int | None = None) -> tuple[list[dict], int, int]:
+    """
+    完整的一次爬取：抓取（附带重试队列中到期的 ID）、入库、JSON 备份、刷新 hot_rank
+
+    返回：(故事列表, 新增数量, 更新数量)
+    """
+    retry_ids = await due_failures()
+
     with HNScraper() as scraper:
-        stories = scraper.crawl()
+        stories = scraper.crawl(limit, retry_ids=retry_ids)
 
-        # 保存到数据库
-        added, updated = await save_to_database(stories)
+        # 保存到数据库，提交成功后再同步重试队列（失败的入队，成功的出队）；
+        # 入库失败时只记录抓取失败，重试成功的 ID 留在队列中，下次继续重试
+        try:
+            added, updated = await save_to_database(stories)
+        except Exception:
+            scraper.succeeded.clear()
+            await flush_fetch_results(scraper)
+            raise
+        await flush_fetch_results(scraper)
 
-        # 也保存 JSON 备份
-        save_to_json(stories)
+    # 也保存 JSON 备份
+    save_to_json(stories)
 
-        # 显示结果
-        print(f"\n找到 {len(stories)} 个 AI 相关故事：")
-        print(f"数据库: 新增 {added} 条, 更新 {updated} 条")
-        print("\n最新故事:")
-        for story in stories[:5]:
-            print(f"  - {story['title']} (score: {story['score']})")
+    # 刷新热度排名
+    await refresh_hot_rank()
+
+    return stories, added, updated
+
+
+async def run_crawler_async():
+    """运行爬虫的入口函数（异步版本，保存到数据库）"""
+    stories, added, updated = await crawl_and_save()
+
+    # 显示结果
+    ai_stories = [story for story in stories if story["is_ai_related"]]
+    print(f"\n找到 {len(ai_stories)}/{len(stories)} 个 AI 相关故事：")
+    print(f"数据库: 新增 {added} 条, 更新 {updated} 条")
+    print("\n最新故事:")
+    for story in ai_stories[:5]:
+        print(f"  - {story['title']} (score: {story['score']})")
 
-        if len(stories) > 5:
-            print(f"  ... 还有 {len(stories) - 5} 条")
+    if len(ai_stories) > 5:
+        print(f"  ... 还有 {len(ai_stories) - 5} 条")
 
 
 if __name__ == "__main__":
+    setup_logging()
     # 使用异步版本
     asyncio.run(run_crawler_async())
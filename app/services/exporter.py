@@ -0,0 +1,77 @@
+"""
+数据导出
+
+按主键分页从数据库流式读取，导出为 JSON 或 CSV，内存占用与表大小无关。
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models import Story
+from app.schemas import StoryInDB
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("json", "csv")
+
+
+async def export_stories(
+    path: str,
+    fmt: str = "json",
+    ai_only: bool = False,
+    batch_size: int = 1000,
+) -> int:
+    """
+    导出故事到文件
+
+    返回：导出的故事数量
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fields = list(StoryInDB.model_fields)
+
+    total = 0
+    last_id = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+        else:
+            f.write("[")
+
+        async with AsyncSessionLocal() as session:
+            while True:
+                stmt = select(Story).where(Story.id > last_id).order_by(Story.id).limit(batch_size)
+                if ai_only:
+                    stmt = stmt.where(Story.is_ai_related == True)
+
+                stories = (await session.execute(stmt)).scalars().all()
+                if not stories:
+                    break
+
+                for story in stories:
+                    row = StoryInDB.model_validate(story).model_dump(mode="json")
+                    if fmt == "csv":
+                        writer.writerow(row)
+                    else:
+                        f.write(",\n" if total else "\n")
+                        f.write(json.dumps(row, ensure_ascii=False))
+                    total += 1
+
+                last_id = stories[-1].id
+                session.expunge_all()
+
+        if fmt == "json":
+            f.write("\n]\n")
+
+    logger.info(f"已导出 {total} 条到 {path}")
+    return total
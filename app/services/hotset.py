@@ -0,0 +1,153 @@
+"""
+首页热门集合（进程内缓存）
+
+绝大多数请求都是"AI 故事按分数降序的前几页"。API 进程在内存中保存分数最高的
+前 N 条 AI 故事的快照，这类请求（包括 min_score 筛选）直接由快照回答，不访问数据库：
+
+- 每条故事是一个 __slots__ 对象，分数另存一份 array 便于二分查找 min_score
+- 任何会话提交后快照失效（SQLAlchemy after_commit 事件），下一次请求时重建，
+  新快照构建完成后整体替换引用，读请求不会看到半成品
+- 其他进程（如 cron 中的 CLI 爬取）写入的数据靠 hot_set_max_age_seconds 过期兜底
+- 快照回答不了的请求（翻页超出快照、无法确定总数等）返回 None，由调用方走 SQL
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_right
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Story
+from app.schemas import StoryInDB
+
+logger = logging.getLogger(__name__)
+
+FIELDS = tuple(StoryInDB.model_fields)
+
+
+class HotStory:
+    """快照中的一条故事（只读，字段与 StoryInDB 一致）"""
+
+    __slots__ = FIELDS
+
+    def __init__(self, row):
+        for name in FIELDS:
+            setattr(self, name, getattr(row, name))
+
+
+class HotSnapshot:
+    """不可变快照：按 (score, id) 降序排列的故事"""
+
+    __slots__ = ("stories", "neg_scores", "ai_total", "complete", "generation", "built_at")
+
+    def __init__(self, stories: list[HotStory], ai_total: int, generation: int = 0):
+        self.stories = stories
+        # 分数取负后为升序，便于用 bisect 统计 score >= min_score 的数量
+        self.neg_scores = array("q", (-s.score for s in stories))
+        self.ai_total = ai_total
+        # 快照包含了全部 AI 故事时，任意查询都能回答
+        self.complete = len(stories) >= ai_total
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+    def query(self, page: int, size: int, min_score: int | None) -> tuple[list[HotStory], int] | None:
+        """回答分页查询，返回 (当页故事, 总数)；快照无法保证正确时返回 None"""
+        if min_score is None:
+            matched = len(self.stories)
+            total = self.ai_total
+        else:
+            matched = bisect_right(self.neg_scores, -min_score)
+            # 快照外的故事分数都 <= 快照最低分，只有 min_score 高于最低分时才能确定总数
+            if not self.complete and (not self.stories or min_score <= self.stories[-1].score):
+                return None
+            total = matched
+
+        offset = (page - 1) * size
+        if not self.complete and offset + size > matched and matched < total:
+            return None
+
+        return self.stories[offset : min(offset + size, matched)], total
+
+
+class HotSet:
+    """热门集合：管理快照的失效与重建"""
+
+    def __init__(self, size: int | None = None, max_age: float | None = None):
+        self.size = settings.hot_set_size if size is None else size
+        self.max_age = settings.hot_set_max_age_seconds if max_age is None else max_age
+        self._snapshot: HotSnapshot | None = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def invalidate(self) -> None:
+        """标记快照失效（只递增版本号，开销可忽略）"""
+        self._generation += 1
+
+    def _is_fresh(self, snapshot: HotSnapshot | None) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.generation == self._generation
+            and time.monotonic() - snapshot.built_at < self.max_age
+        )
+
+    async def rebuild(self) -> HotSnapshot:
+        """从数据库重建快照并原子替换"""
+        generation = self._generation
+        columns = [getattr(Story, name) for name in FIELDS]
+
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(*columns)
+                .where(Story.is_ai_related == True)
+                .order_by(Story.score.desc(), Story.id.desc())
+                .limit(self.size)
+            )
+            rows = (await session.execute(stmt)).all()
+
+            stmt = select(func.count()).select_from(Story).where(Story.is_ai_related == True)
+            ai_total = (await session.execute(stmt)).scalar()
+
+        snapshot = HotSnapshot([HotStory(row) for row in rows], ai_total, generation)
+        self._snapshot = snapshot
+        logger.debug(f"热门集合已重建: {len(rows)}/{ai_total} 条")
+        return snapshot
+
+    async def get_snapshot(self) -> HotSnapshot:
+        """获取最新快照，失效或过期时重建（并发请求只重建一次）"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            return await self.rebuild()
+
+    async def query(self, page: int, size: int, min_score: int | None = None) -> tuple[list[HotStory], int] | None:
+        """用快照回答"AI 故事按分数降序"的分页查询，无法回答时返回 None"""
+        if not self.enabled:
+            return None
+        snapshot = await self.get_snapshot()
+        return snapshot.query(page, size, min_score)
+
+
+# 全局热门集合实例
+hot_set = HotSet()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    """任何会话提交后快照失效，下一次请求时重建"""
+    hot_set.invalidate()
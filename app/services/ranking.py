@@ -0,0 +1,104 @@
+"""
+HN 风格热度排名
+
+hot_rank = (score - 1) / (age_hours + 2) ^ gravity
+
+- 新入库的故事在 save_to_database 中直接计算 hot_rank
+- 每次爬取后用分批的集合式 UPDATE 刷新时间窗口内的 hot_rank（随时间衰减），
+  窗口外的故事统一置 0，之后不再参与刷新；衰减不算内容变化，刷新时保持 updated_at 不变
+  （实时推送按 updated_at 检测其他进程写入的变更）
+- hot_rank 有 (is_ai_related, hot_rank) 索引，sort=hot 时按索引顺序取前 N 条，不需要全表排序
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, literal, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models import Story
+
+logger = logging.getLogger(__name__)
+
+
+def hot_rank(score: int, posted_at: datetime, now: datetime | None = None) -> float:
+    """计算单条故事的 hot_rank（与 SQL 版本公式一致，时间窗口外为 0）"""
+    now = now or datetime.now()
+    if posted_at < now - timedelta(days=settings.hot_rank_window_days):
+        return 0.0
+    age_hours = max((now - posted_at).total_seconds() / 3600, 0.0)
+    return (score - 1) / (age_hours + 2) ** settings.hot_rank_gravity
+
+
+def _age_hours_expr(now: datetime):
+    """发布至今的小时数（按数据库方言生成表达式）"""
+    now_param = bindparam("now", now)
+    if engine.dialect.name == "sqlite":
+        return (func.julianday(now_param) - func.julianday(Story.posted_at)) * 24.0
+    return func.extract("epoch", now_param - Story.posted_at) / 3600.0
+
+
+def _hot_rank_expr(now: datetime):
+    """SQL 版本的 hot_rank 表达式"""
+    age_hours = _age_hours_expr(now)
+    return (Story.score - 1) / func.power(age_hours + 2, literal(settings.hot_rank_gravity))
+
+
+async def refresh_hot_rank(now: datetime | None = None, batch_size: int | None = None) -> int:
+    """
+    刷新 hot_rank
+
+    时间窗口内的故事按主键区间分批 UPDATE（每批一个事务，不长时间锁表）；
+    刚滑出窗口的故事一次性置 0。
+    返回：刷新的故事数量
+    """
+    now = now or datetime.now()
+    batch_size = batch_size or settings.hot_rank_batch_size
+    cutoff = now - timedelta(days=settings.hot_rank_window_days)
+
+    total = 0
+    async with AsyncSessionLocal() as session:
+        # 滑出窗口的故事不再衰减，直接置 0。hot_rank > 0 的只有窗口内（以及刚滑出）的故事，
+        # 按 idx_hot_rank 范围查找，扫描量与历史数据量无关；不设发布时间下限，
+        # 爬取中断多久都不会遗漏。is_ai_related IN (...) 让前缀列可以走索引。
+        # （分数为 0 的故事 hot_rank 为负，只会排在最后，不需要处理）
+        stmt = (
+            update(Story)
+            .where(
+                Story.is_ai_related.in_([True, False]),
+                Story.hot_rank > 0,
+                Story.posted_at < cutoff,
+            )
+            .values(hot_rank=0, updated_at=Story.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
+        await session.commit()
+
+        # 窗口内的主键范围（走 idx_posted_at）
+        stmt = select(func.min(Story.id), func.max(Story.id)).where(Story.posted_at >= cutoff)
+        min_id, max_id = (await session.execute(stmt)).one()
+        if min_id is None:
+            return 0
+
+        expr = _hot_rank_expr(now)
+        for start in range(min_id, max_id + 1, batch_size):
+            stmt = (
+                update(Story)
+                .where(
+                    Story.id >= start,
+                    Story.id < start + batch_size,
+                    Story.posted_at >= cutoff,
+                )
+                .values(hot_rank=expr, updated_at=Story.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            total += result.rowcount
+
+    logger.info(f"hot_rank 刷新完成: {total} 条")
+    return total
@@ -0,0 +1,93 @@
+"""
+库内重新分类
+
+修改 ai_keywords 后不需要重新爬取：用集合式 UPDATE 在数据库里直接重算
+is_ai_related 和 matched_keywords。
+
+- 匹配规则与 crawler.match_keywords 一致：小写标题做子串匹配（LIKE，自动转义 % 和 _）；
+  SQLite 内置 lower() 只转换 ASCII，改用注册的 unicode_lower()（即 str.lower()），
+  PostgreSQL 的 lower() 按数据库的字符集规则转换，个别特殊字符（如土耳其语 İ）可能与 Python 不同
+- 关键词列表为空时所有故事标记为非 AI 相关
+- 按主键区间分批，每批一个短事务，不会长时间锁表
+- 只改写分类结果真正变化的行，没变化的行不产生写入，idx_ai_score 等索引也不需要重建对应条目；
+  完成后 ANALYZE 更新统计信息，让查询计划继续选用 idx_ai_score
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import reduce
+
+from sqlalchemy import case, false, func, literal, null, or_, select, text, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models import Story
+
+logger = logging.getLogger(__name__)
+
+
+def _classification_exprs(keywords: list[str]):
+    """生成 (is_ai_related, matched_keywords) 的 SQL 表达式"""
+    if not keywords:
+        return false(), null()
+
+    if engine.dialect.name == "sqlite":
+        title = func.unicode_lower(Story.title)
+    else:
+        title = func.lower(Story.title)
+    matches = [title.contains(kw, autoescape=True) for kw in keywords]
+
+    is_ai = or_(*matches)
+
+    # 命中的关键词按配置顺序拼接为 "kw1,kw2"，没有命中时为 NULL
+    parts = [case((m, literal(kw + ",")), else_=literal("")) for m, kw in zip(matches, keywords)]
+    joined = reduce(lambda a, b: a + b, parts)
+    matched = func.nullif(func.rtrim(joined, ","), "")
+
+    return is_ai, matched
+
+
+async def reclassify_stories(
+    keywords: list[str] | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """
+    按关键词重新分类全表
+
+    返回：分类结果发生变化的故事数量
+    """
+    keywords = keywords or settings.ai_keywords_list
+    batch_size = batch_size or settings.reclassify_batch_size
+    is_ai, matched = _classification_exprs(keywords)
+
+    changed = 0
+    async with AsyncSessionLocal() as session:
+        min_id, max_id = (await session.execute(select(func.min(Story.id), func.max(Story.id)))).one()
+        if min_id is None:
+            return 0
+
+        for start in range(min_id, max_id + 1, batch_size):
+            stmt = (
+                update(Story)
+                .where(
+                    Story.id >= start,
+                    Story.id < start + batch_size,
+                    or_(
+                        Story.is_ai_related.is_distinct_from(is_ai),
+                        Story.matched_keywords.is_distinct_from(matched),
+                    ),
+                )
+                .values(is_ai_related=is_ai, matched_keywords=matched)
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            changed += result.rowcount
+
+        # 更新统计信息（SQLite 与 PostgreSQL 语法相同）
+        await session.execute(text("ANALYZE stories"))
+        await session.commit()
+
+    logger.info(f"重新分类完成: {changed} 条发生变化")
+    return changed
@@ -0,0 +1,261 @@
+"""
+数据保留与归档
+
+stories 表只保留近期数据，过期故事按发布月份归档到压缩文件：
+1. 超过 retention_days 的故事，以及超过 retention_non_ai_days 的非 AI 故事视为过期
+2. 按主键分批读取过期故事，追加写入 {archive_dir}/stories-YYYY-MM.jsonl.gz：
+   每批先在内存中压缩成一个完整的 gzip 成员，和原文件内容一起写入临时文件并 fsync，
+   再原子替换原文件；替换完成后才从热表删除该批。进程在任何时刻崩溃，归档文件要么是旧版本
+   要么是新版本，不会出现写了一半的成员，也不会丢数据（最多在归档里重复，读取时按 hn_id 去重）
+3. 删除重复组的主条目前，把仍留在热表的重复条目中最早入库的一条提升为新的主条目，
+   其余改为指向它，避免 collapse_duplicates 把没有主条目的重复故事全部隐藏
+4. 全部完成后执行 VACUUM / ANALYZE 回收空间并更新统计信息
+
+归档月份可以通过 API 按需查询，不需要回灌到数据库。查询时内存中只缓存每个月份的
+(hn_id, score, is_ai_related) 索引，当页的完整数据再流式解压归档文件取出。
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from sqlalchemy import and_, delete, or_, select, text, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models import Story
+from app.schemas import StoryInDB
+
+logger = logging.getLogger(__name__)
+
+MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# 归档行由 StoryInDB.model_dump 写出，hn_id 固定在行首，不用解析整行即可取出
+_HN_ID_RE = re.compile(r'\{"hn_id": (\d+),')
+
+
+def archive_path(month: str) -> str:
+    """归档文件路径（month 格式 YYYY-MM）"""
+    return os.path.join(settings.archive_dir, f"stories-{month}.jsonl.gz")
+
+
+def _expired_condition(now: datetime):
+    """过期条件：超过保留期，或超过非 AI 保留期的非 AI 故事"""
+    return or_(
+        Story.posted_at < now - timedelta(days=settings.retention_days),
+        and_(
+            Story.is_ai_related == False,
+            Story.posted_at < now - timedelta(days=settings.retention_non_ai_days),
+        ),
+    )
+
+
+def _append_archive(month: str, rows: list[dict]) -> None:
+    """
+    追加写入一个月份的归档（gzip 支持多成员拼接，追加后仍是合法文件）
+
+    复制原文件到临时文件、追加新成员并 fsync 后原子替换，崩溃时不会留下截断的 gzip 成员。
+    """
+    path = archive_path(month)
+    member = gzip.compress("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8"))
+
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(path):
+        shutil.copyfile(path, tmp_path)
+    with open(tmp_path, "ab") as f:
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # 目录项也落盘，保证替换在删除热表数据之前已持久化（Windows 不支持打开目录，跳过）
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+async def archive_stories(
+    now: datetime | None = None,
+    batch_size: int | None = None,
+    compact: bool = True,
+) -> dict:
+    """
+    归档过期故事并从热表删除
+
+    返回：{"archived": 归档数量, "months": 涉及的月份列表}
+    """
+    now = now or datetime.now()
+    batch_size = batch_size or settings.retention_batch_size
+    os.makedirs(settings.archive_dir, exist_ok=True)
+
+    archived = 0
+    months: set[str] = set()
+    last_id = 0
+
+    async with AsyncSessionLocal() as session:
+        while True:
+            stmt = (
+                select(Story)
+                .where(Story.id > last_id, _expired_condition(now))
+                .order_by(Story.id)
+                .limit(batch_size)
+            )
+            stories = (await session.execute(stmt)).scalars().all()
+            if not stories:
+                break
+
+            by_month: dict[str, list[dict]] = defaultdict(list)
+            for story in stories:
+                month = story.posted_at.strftime("%Y-%m")
+                by_month[month].append(StoryInDB.model_validate(story).model_dump(mode="json"))
+
+            # 先写归档，再删除热表数据
+            for month, rows in by_month.items():
+                _append_archive(month, rows)
+            months.update(by_month)
+
+            ids = [story.id for story in stories]
+            await _promote_duplicates(session, stories, ids)
+            await session.execute(delete(Story).where(Story.id.in_(ids)))
+            await session.commit()
+            session.expunge_all()
+
+            archived += len(ids)
+            last_id = ids[-1]
+            logger.info(f"已归档 {archived} 条")
+
+    if archived and compact:
+        await compact_database()
+
+    logger.info(f"归档完成: {archived} 条，涉及 {len(months)} 个月份")
+    return {"archived": archived, "months": sorted(months)}
+
+
+async def _promote_duplicates(session, stories: list[Story], deleted_ids: list[int]) -> None:
+    """
+    即将删除的主条目如果还有留在热表的重复条目，提升其中最早入库的一条为新主条目
+
+    按 url_hash（带索引）查出同组的其他故事，用按主键的批量 UPDATE 改写 duplicate_of。
+    """
+    primaries = {s.url_hash: s.hn_id for s in stories if s.duplicate_of is None and s.url_hash}
+    if not primaries:
+        return
+
+    stmt = (
+        select(Story.id, Story.hn_id, Story.url_hash, Story.duplicate_of)
+        .where(Story.url_hash.in_(primaries), Story.id.notin_(deleted_ids))
+        .order_by(Story.id)
+    )
+    new_primaries: dict[int, int] = {}
+    params = []
+    for row in (await session.execute(stmt)).all():
+        old_primary = primaries[row.url_hash]
+        if row.duplicate_of != old_primary:
+            continue
+        new_primary = new_primaries.setdefault(old_primary, row.hn_id)
+        params.append({"id": row.id, "duplicate_of": None if new_primary == row.hn_id else new_primary})
+
+    if params:
+        await session.execute(update(Story), params)
+        logger.info(f"重复组主条目已归档，{len(new_primaries)} 组提升了新的主条目")
+
+
+async def compact_database() -> None:
+    """回收空间并更新统计信息（VACUUM 不能在事务中执行，使用自动提交连接）"""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if engine.dialect.name == "sqlite":
+            await conn.execute(text("VACUUM"))
+            await conn.execute(text("ANALYZE"))
+        else:
+            await conn.execute(text("VACUUM ANALYZE stories"))
+    logger.info("数据库压缩完成")
+
+
+def list_archived_months() -> list[dict]:
+    """列出所有归档月份"""
+    if not os.path.isdir(settings.archive_dir):
+        return []
+
+    months = []
+    for name in sorted(os.listdir(settings.archive_dir), reverse=True):
+        match = re.match(r"^stories-(\d{4}-\d{2})\.jsonl\.gz$", name)
+        if match:
+            path = os.path.join(settings.archive_dir, name)
+            months.append({"month": match.group(1), "size_bytes": os.path.getsize(path)})
+    return months
+
+
+@lru_cache(maxsize=32)
+def _load_index(path: str, mtime: float) -> tuple[array, array, bytes]:
+    """
+    读取归档文件的索引：按分数降序的 (hn_id, score, is_ai_related)
+
+    同一 hn_id 保留最后一次写入；只缓存这三列（每条约 17 字节），mtime 作为缓存键。
+    """
+    latest: dict[int, tuple[int, bool]] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            latest[row["hn_id"]] = (row["score"], row["is_ai_related"])
+
+    order = sorted(latest, key=lambda hn_id: latest[hn_id][0], reverse=True)
+    return (
+        array("q", order),
+        array("q", (latest[hn_id][0] for hn_id in order)),
+        bytes(latest[hn_id][1] for hn_id in order),
+    )
+
+
+def _read_rows(path: str, hn_ids: list[int]) -> list[dict]:
+    """流式解压归档文件，取出指定 hn_id 的完整数据（按 hn_ids 顺序，同一 hn_id 取最后一次写入）"""
+    wanted = set(hn_ids)
+    lines: dict[int, str] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            match = _HN_ID_RE.match(line)
+            hn_id = int(match.group(1)) if match else json.loads(line)["hn_id"]
+            if hn_id in wanted:
+                lines[hn_id] = line
+    return [json.loads(lines[hn_id]) for hn_id in hn_ids if hn_id in lines]
+
+
+def query_archive(
+    month: str,
+    page: int,
+    size: int,
+    ai_only: bool = True,
+    min_score: int | None = None,
+) -> tuple[list[dict], int] | None:
+    """
+    分页查询某个月份的归档故事（按分数降序）
+
+    返回：(当页故事, 总数)，归档不存在时返回 None
+    """
+    path = archive_path(month)
+    if not os.path.exists(path):
+        return None
+
+    hn_ids, scores, ai_flags = _load_index(path, os.path.getmtime(path))
+    matched = [
+        i
+        for i in range(len(hn_ids))
+        if (not ai_only or ai_flags[i]) and (min_score is None or scores[i] >= min_score)
+    ]
+
+    offset = (page - 1) * size
+    page_ids = [hn_ids[i] for i in matched[offset : offset + size]]
+    items = _read_rows(path, page_ids) if page_ids else []
+    return items, len(matched)
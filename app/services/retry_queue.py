@@ -0,0 +1,114 @@
+"""
+抓取失败重试队列
+
+fetch_story_detail 失败（tenacity 重试也用完）的 item 记录到 failed_fetches 表：
+- 每次失败 attempts + 1，下次重试时间按指数退避：base * 2^(attempts-1)，不超过上限
+- 超过最大次数后 next_retry_at 置空，视为放弃（仍保留记录便于排查）
+- 之后每次爬取从队列中取一批到期的 ID，和热门列表一起抓取；抓取成功即出队
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import FailedFetch
+
+if TYPE_CHECKING:
+    from app.services.crawler import HNScraper
+
+logger = logging.getLogger(__name__)
+
+# 出队时单条 DELETE ... IN 的最大参数数量
+_DELETE_CHUNK = 500
+
+
+def next_retry_at(attempts: int, now: datetime) -> datetime | None:
+    """计算下次重试时间，超过最大次数返回 None"""
+    if attempts >= settings.retry_max_attempts:
+        return None
+    delay = min(settings.retry_base_seconds * 2 ** (attempts - 1), settings.retry_max_seconds)
+    return now + timedelta(seconds=delay)
+
+
+async def due_failures(limit: int | None = None, now: datetime | None = None) -> list[int]:
+    """取出到期待重试的 item ID（最早到期的优先）"""
+    limit = limit or settings.retry_batch_size
+    now = now or datetime.now()
+
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(FailedFetch.hn_id)
+            .where(FailedFetch.next_retry_at <= now)
+            .order_by(FailedFetch.next_retry_at)
+            .limit(limit)
+        )
+        return list((await session.execute(stmt)).scalars().all())
+
+
+async def record_failures(failures: dict[int, str], now: datetime | None = None) -> None:
+    """记录一批抓取失败（已在队列中的累加次数并推迟重试时间）"""
+    if not failures:
+        return
+    now = now or datetime.now()
+
+    async with AsyncSessionLocal() as session:
+        stmt = select(FailedFetch).where(FailedFetch.hn_id.in_(failures))
+        existing = {row.hn_id: row for row in (await session.execute(stmt)).scalars()}
+
+        for hn_id, error in failures.items():
+            row = existing.get(hn_id)
+            if row is None:
+                session.add(
+                    FailedFetch(
+                        hn_id=hn_id,
+                        attempts=1,
+                        last_error=error[:500],
+                        next_retry_at=next_retry_at(1, now),
+                        first_failed_at=now,
+                        last_failed_at=now,
+                    )
+                )
+            else:
+                row.attempts += 1
+                row.last_error = error[:500]
+                row.last_failed_at = now
+                row.next_retry_at = next_retry_at(row.attempts, now)
+
+        await session.commit()
+
+    logger.info(f"重试队列: 记录 {len(failures)} 个抓取失败")
+
+
+async def resolve_failures(hn_ids: set[int] | list[int]) -> int:
+    """抓取成功的 item 出队，返回出队数量"""
+    hn_ids = list(hn_ids)
+    resolved = 0
+
+    async with AsyncSessionLocal() as session:
+        for i in range(0, len(hn_ids), _DELETE_CHUNK):
+            chunk = hn_ids[i : i + _DELETE_CHUNK]
+            result = await session.execute(delete(FailedFetch).where(FailedFetch.hn_id.in_(chunk)))
+            resolved += result.rowcount
+        await session.commit()
+
+    if resolved:
+        logger.info(f"重试队列: {resolved} 个 item 重试成功")
+    return resolved
+
+
+async def flush_fetch_results(scraper: "HNScraper") -> None:
+    """把爬虫记录的成功/失败同步到重试队列，并清空记录"""
+    failures = dict(scraper.failures)
+    succeeded = set(scraper.succeeded)
+    scraper.failures.clear()
+    scraper.succeeded.clear()
+
+    await record_failures(failures)
+    if succeeded:
+        await resolve_failures(succeeded)
@@ -0,0 +1,295 @@
+"""
+AI 相关度评分
+
+用哈希 TF-IDF 特征 + 线性模型（逻辑回归）给故事打分，输出 0-1 的 ai_score：
+1. 特征：标题单词、相邻词组（bigram）、URL 域名
+2. 特征哈希到固定维度（不需要维护词表），TF-IDF 加权后按行 L2 归一化
+   （关键词先验模型不做归一化，直接按命中次数计分，避免长标题稀释关键词）
+3. 打分和训练都以稀疏三元组（行, 列, 值）+ np.bincount 批量计算，
+   一次处理成千上万条标题，百万级回填在 CPU 上也足够快
+
+没有训练好的模型文件时，使用由 ai_keywords 构造的先验模型。
+模型文件按修改时间缓存，重新训练后运行中的进程会在下一次打分时自动加载新模型。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Story
+from app.services.urls import extract_domain
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 1 << 18
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def extract_features(title: str | None, url: str | None = None) -> list[str]:
+    """提取特征：标题单词、bigram、域名及其上级域名"""
+    tokens = _TOKEN_RE.findall((title or "").lower())
+    features = [f"t:{tok}" for tok in tokens]
+    features += [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+
+    domain = extract_domain(url)
+    if domain:
+        parts = domain.split(".")
+        features += [f"d:{'.'.join(parts[i:])}" for i in range(len(parts) - 1)]
+
+    return features
+
+
+@lru_cache(maxsize=1 << 17)
+def _hash(feature: str) -> int:
+    """稳定的特征哈希（内置 hash() 每个进程的种子不同，不能用）"""
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+
+class RelevanceScorer:
+    """哈希 TF-IDF + 线性模型"""
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        idf: np.ndarray,
+        bias: float,
+        normalize: bool = True,
+    ):
+        self.weights = weights.astype(np.float32)
+        self.idf = idf.astype(np.float32)
+        self.bias = float(bias)
+        self.normalize = normalize
+        self.n_features = len(weights)
+
+    @classmethod
+    def from_keywords(
+        cls,
+        keywords: list[str],
+        n_features: int = N_FEATURES,
+        weight: float = 3.0,
+        bias: float = -1.5,
+    ) -> "RelevanceScorer":
+        """
+        由关键词构造先验模型：关键词（单词或词组）对应的特征赋正权重
+
+        特征不归一化，得分只取决于命中次数：没有命中约 0.18，命中一次约 0.82，
+        与标题长短无关，默认情况下 min_ai_score=0.5 即可区分是否命中关键词。
+        """
+        weights = np.zeros(n_features, dtype=np.float32)
+        mask = n_features - 1
+
+        for kw in keywords:
+            tokens = _TOKEN_RE.findall(kw.lower())
+            if len(tokens) == 1:
+                weights[_hash(f"t:{tokens[0]}") & mask] = weight
+            else:
+                for a, b in zip(tokens, tokens[1:]):
+                    weights[_hash(f"b:{a}_{b}") & mask] = weight
+
+        return cls(weights, np.ones(n_features, dtype=np.float32), bias, normalize=False)
+
+    def vectorize(
+        self, titles: list[str], urls: list[str | None] | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        批量向量化
+
+        返回稀疏三元组 (rows, cols, vals)，同一行的重复特征已合并，
+        值为 TF-IDF（normalize=True 时按行 L2 归一化）。
+        """
+        urls = urls if urls is not None else [None] * len(titles)
+        mask = self.n_features - 1
+
+        rows: list[int] = []
+        cols: list[int] = []
+        for i, (title, url) in enumerate(zip(titles, urls)):
+            hashed = [_hash(f) & mask for f in extract_features(title, url)]
+            rows.extend([i] * len(hashed))
+            cols.extend(hashed)
+
+        if not cols:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float32)
+
+        # 合并同一行的重复特征，得到词频
+        keys = np.asarray(rows, dtype=np.int64) * self.n_features + np.asarray(cols, dtype=np.int64)
+        keys, tf = np.unique(keys, return_counts=True)
+        rows_arr = keys // self.n_features
+        cols_arr = keys % self.n_features
+
+        vals = tf.astype(np.float32) * self.idf[cols_arr]
+        if self.normalize:
+            norms = np.sqrt(np.bincount(rows_arr, weights=vals * vals, minlength=len(titles)))
+            vals = vals / norms[rows_arr].astype(np.float32)
+
+        return rows_arr, cols_arr, vals
+
+    def decision_function(
+        self, titles: list[str], urls: list[str | None] | None = None
+    ) -> np.ndarray:
+        """线性得分（未经过 sigmoid）"""
+        rows, cols, vals = self.vectorize(titles, urls)
+        return np.bincount(rows, weights=vals * self.weights[cols], minlength=len(titles)) + self.bias
+
+    def score(self, titles: list[str], urls: list[str | None] | None = None) -> np.ndarray:
+        """批量打分，返回 0-1 之间的 ai_score"""
+        if not titles:
+            return np.empty(0, dtype=np.float32)
+        return _sigmoid(self.decision_function(titles, urls)).astype(np.float32)
+
+    def fit(
+        self,
+        titles: list[str],
+        urls: list[str | None],
+        labels: np.ndarray,
+        epochs: int = 50,
+        lr: float = 5.0,
+        l2: float = 1e-6,
+    ) -> "RelevanceScorer":
+        """
+        训练模型（全批量梯度下降的逻辑回归）
+
+        先根据语料计算平滑 IDF，再在归一化的稀疏特征上迭代更新权重。
+        """
+        labels = np.asarray(labels, dtype=np.float32)
+        n = len(titles)
+        self.normalize = True
+
+        # 计算 IDF：每个特征出现在多少条标题中
+        self.idf = np.ones(self.n_features, dtype=np.float32)
+        _, cols, _ = self.vectorize(titles, urls)
+        df = np.bincount(cols, minlength=self.n_features)
+        self.idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+
+        rows, cols, vals = self.vectorize(titles, urls)
+        for _ in range(epochs):
+            margin = np.bincount(rows, weights=vals * self.weights[cols], minlength=n) + self.bias
+            grad = _sigmoid(margin) - labels
+            grad_w = np.bincount(cols, weights=vals * grad[rows], minlength=self.n_features) / n
+            self.weights -= (lr * (grad_w + l2 * self.weights)).astype(np.float32)
+            self.bias -= lr * float(grad.mean())
+
+        return self
+
+    def save(self, path: str) -> None:
+        """保存模型到 .npz 文件（先写临时文件再替换，其他进程不会读到写了一半的文件）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights,
+                idf=self.idf,
+                bias=np.float32(self.bias),
+                normalize=np.bool_(self.normalize),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RelevanceScorer":
+        """从 .npz 文件加载模型"""
+        with np.load(path) as data:
+            normalize = bool(data["normalize"]) if "normalize" in data.files else True
+            return cls(data["weights"], data["idf"], float(data["bias"]), normalize)
+
+
+# 全局评分模型及其缓存键（模型文件的修改时间，None 表示关键词先验模型）
+_scorer: RelevanceScorer | None = None
+_scorer_mtime: float | None = None
+
+
+def get_scorer() -> RelevanceScorer:
+    """
+    获取全局评分模型（优先加载训练好的模型文件）
+
+    以模型文件的修改时间作为缓存键：reclassify --train 写入新模型后，
+    运行中的 API 进程下一次打分就会加载新模型，新旧数据的 ai_score 保持一致。
+    """
+    global _scorer, _scorer_mtime
+    try:
+        mtime = os.path.getmtime(settings.ai_scorer_path)
+    except OSError:
+        mtime = None
+
+    if _scorer is None or mtime != _scorer_mtime:
+        if mtime is not None:
+            _scorer = RelevanceScorer.load(settings.ai_scorer_path)
+            logger.info(f"加载评分模型: {settings.ai_scorer_path}")
+        else:
+            _scorer = RelevanceScorer.from_keywords(settings.ai_keywords_list)
+        _scorer_mtime = mtime
+    return _scorer
+
+
+async def rescore_stories(
+    scorer: RelevanceScorer | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """
+    重新计算全表的 ai_score（无需重新爬取）
+
+    按主键分页读取，每批打分后用按主键的批量 UPDATE 写回。
+    返回：处理的故事数量
+    """
+    scorer = scorer or get_scorer()
+    batch_size = batch_size or settings.ai_score_batch_size
+
+    total = 0
+    last_id = 0
+    async with AsyncSessionLocal() as session:
+        while True:
+            stmt = (
+                select(Story.id, Story.title, Story.url)
+                .where(Story.id > last_id)
+                .order_by(Story.id)
+                .limit(batch_size)
+            )
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                break
+
+            scores = scorer.score([r.title for r in rows], [r.url for r in rows])
+            await session.execute(
+                update(Story),
+                [{"id": r.id, "ai_score": float(s)} for r, s in zip(rows, scores)],
+            )
+            await session.commit()
+
+            total += len(rows)
+            last_id = rows[-1].id
+            logger.info(f"已重新评分 {total} 条")
+
+    return total
+
+
+async def train_from_database(path: str | None = None) -> RelevanceScorer:
+    """以 is_ai_related 为标签训练模型并保存"""
+    path = path or settings.ai_scorer_path
+
+    async with AsyncSessionLocal() as session:
+        stmt = select(Story.title, Story.url, Story.is_ai_related)
+        rows = (await session.execute(stmt)).all()
+
+    labels = np.array([r.is_ai_related for r in rows], dtype=np.float32)
+    if len(rows) == 0 or labels.min() == labels.max():
+        raise ValueError("训练数据需要同时包含 AI 相关和非 AI 相关的故事")
+
+    scorer = RelevanceScorer.from_keywords(settings.ai_keywords_list)
+    scorer.fit([r.title for r in rows], [r.url for r in rows], labels)
+    scorer.save(path)
+    logger.info(f"模型已保存到 {path}（训练样本 {len(rows)} 条）")
+    return scorer
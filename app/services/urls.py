@@ -0,0 +1,157 @@
+"""
+URL 规范化与去重
+
+同一篇文章经常以不同的 hn_id 被多次提交，URL 只在细节上不同
+（跟踪参数、http/https、www、结尾斜杠等）。这里把 URL 规范化为 canonical_url，
+再取哈希作为 url_hash（带索引），入库时按 url_hash 查找即可识别重复，无需两两比较。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import select, update
+
+from app.database import AsyncSessionLocal
+from app.models import Story
+
+logger = logging.getLogger(__name__)
+
+# 需要去掉的跟踪参数
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "yclid",
+    "msclkid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_hsenc",
+    "_hsmi",
+    "ref",
+    "ref_src",
+    "ref_url",
+    "si",
+    "spm",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def extract_domain(url: str | None) -> str | None:
+    """提取 URL 域名（小写，去掉 www. 前缀）"""
+    if not url:
+        return None
+    try:
+        host = urlsplit(url.strip()).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_url(url: str | None) -> str | None:
+    """
+    URL 规范化
+
+    - http/https 统一为 https，域名小写并去掉 www. 和默认端口
+    - 去掉 fragment 和跟踪参数，其余查询参数按名称排序
+    - 去掉路径结尾的斜杠
+    """
+    if not url:
+        return None
+
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+
+    domain = extract_domain(url)
+    if not domain:
+        return None
+
+    scheme = parts.scheme.lower()
+    netloc = domain
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{domain}:{port}"
+    if scheme in DEFAULT_PORTS:
+        scheme = "https"
+
+    path = parts.path.rstrip("/")
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def url_hash(canonical_url: str | None) -> str | None:
+    """规范化 URL 的哈希（16 位十六进制）"""
+    if not canonical_url:
+        return None
+    return hashlib.sha1(canonical_url.encode("utf-8")).hexdigest()[:16]
+
+
+def url_fields(url: str | None) -> dict:
+    """计算入库需要的 URL 相关字段"""
+    canonical = normalize_url(url)
+    return {
+        "canonical_url": canonical,
+        "url_hash": url_hash(canonical),
+        "domain": extract_domain(url),
+    }
+
+
+async def backfill_url_fields(batch_size: int = 1000) -> int:
+    """
+    为已有数据补全 canonical_url / url_hash / domain 并标记重复
+
+    按主键顺序处理，同一 url_hash 下最早入库的故事作为主条目。
+    返回：处理的故事数量
+    """
+    total = 0
+    last_id = 0
+    primaries: dict[str, int] = {}
+
+    async with AsyncSessionLocal() as session:
+        while True:
+            stmt = (
+                select(Story.id, Story.hn_id, Story.url)
+                .where(Story.id > last_id)
+                .order_by(Story.id)
+                .limit(batch_size)
+            )
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                break
+
+            params = []
+            for row in rows:
+                fields = url_fields(row.url)
+                h = fields["url_hash"]
+                duplicate_of = None
+                if h:
+                    duplicate_of = primaries.setdefault(h, row.hn_id)
+                    if duplicate_of == row.hn_id:
+                        duplicate_of = None
+                params.append({"id": row.id, "duplicate_of": duplicate_of, **fields})
+
+            await session.execute(update(Story), params)
+            await session.commit()
+
+            total += len(rows)
+            last_id = rows[-1].id
+
+    logger.info(f"URL 字段补全完成: {total} 条")
+    return total
@@ -0,0 +1,350 @@
+"""
+多进程分片爬取
+
+多个爬虫进程（可以分布在不同主机上）通过数据库中的 crawl_leases 表协调：
+1. plan_shards 把 HN item ID 区间切成固定大小的分片写入租约表
+2. 每个 worker 用比较并交换（CAS）的 UPDATE 领取一个分片，拿到租约
+3. 处理过程中定期心跳续约，同时记录进度 cursor_id
+4. worker 退出时归还分片；进程崩溃时租约过期，其他 worker 从 cursor_id 接着处理
+5. 每次领取 attempts + 1，超过 worker_max_attempts 仍未完成的分片标记为 failed，
+   不再被领取（避免持续出错的分片被所有 worker 无限重试），可用 backfill plan --retry-failed 重置
+
+所有 worker 共用 HNScraper 的抓取逻辑和 save_to_database 的写入逻辑，
+吞吐量随 worker 数量近似线性增长。
+
+用法：python -m app backfill plan / python -m app backfill work（每个进程一个 worker）
+
+租约时间使用 UTC，多主机部署时需要保证时钟大致同步（误差远小于租约有效期）。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, case, func, or_, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import CrawlLease
+from app.services.crawler import HNScraper, save_to_database
+from app.services.retry_queue import flush_fetch_results
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_JOB = "backfill"
+
+
+def _utcnow() -> datetime:
+    """当前 UTC 时间（naive，与数据库中的 DateTime 列保持一致）"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def default_worker_id() -> str:
+    """默认 worker 标识：主机名 + 进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def plan_shards(
+    start_id: int,
+    end_id: int,
+    job: str = BACKFILL_JOB,
+    shard_size: int | None = None,
+) -> int:
+    """
+    将 [start_id, end_id) 切分为分片写入租约表
+
+    只为已有分片没有覆盖的区间新建分片，因此可以重复执行（例如扩展回填范围），
+    上次规划的结束位置不在分片边界上时也不会留下空隙。
+    返回：新建分片数量
+    """
+    shard_size = shard_size or settings.worker_shard_size
+
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(CrawlLease.start_id, CrawlLease.end_id)
+            .where(
+                CrawlLease.job == job,
+                CrawlLease.end_id > start_id,
+                CrawlLease.start_id < end_id,
+            )
+            .order_by(CrawlLease.start_id)
+        )
+        existing = (await session.execute(stmt)).all()
+
+        # 已有分片之间（以及之后）的空隙
+        gaps = []
+        cursor = start_id
+        for shard_start, shard_end in [*existing, (end_id, end_id)]:
+            if shard_start > cursor:
+                gaps.append((cursor, min(shard_start, end_id)))
+            cursor = max(cursor, shard_end)
+
+        created = 0
+        for gap_start, gap_end in gaps:
+            for shard_start in range(gap_start, gap_end, shard_size):
+                session.add(
+                    CrawlLease(
+                        job=job,
+                        start_id=shard_start,
+                        end_id=min(shard_start + shard_size, gap_end),
+                        status="pending",
+                        cursor_id=shard_start,
+                        attempts=0,
+                    )
+                )
+                created += 1
+
+        await session.commit()
+
+    logger.info(f"任务 {job}: 新建 {created} 个分片，区间 [{start_id}, {end_id})")
+    return created
+
+
+async def reset_failed_shards(job: str = BACKFILL_JOB) -> int:
+    """把 failed 分片重置为 pending 并清零领取次数（排除故障后重新回填），返回重置数量"""
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            update(CrawlLease)
+            .where(CrawlLease.job == job, CrawlLease.status == "failed")
+            .values(status="pending", attempts=0, worker_id=None)
+        )
+        result = await session.execute(stmt)
+        await session.commit()
+
+    logger.info(f"任务 {job}: 重置 {result.rowcount} 个失败分片")
+    return result.rowcount
+
+
+async def shard_status(job: str = BACKFILL_JOB) -> dict[str, int]:
+    """各状态的分片数量"""
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(CrawlLease.status, func.count())
+            .where(CrawlLease.job == job)
+            .group_by(CrawlLease.status)
+        )
+        return dict((await session.execute(stmt)).all())
+
+
+async def _fail_exhausted(session, job: str, now: datetime) -> None:
+    """租约已过期且领取次数用尽的分片（worker 多次崩溃）标记为 failed"""
+    stmt = (
+        update(CrawlLease)
+        .where(
+            CrawlLease.job == job,
+            CrawlLease.status == "running",
+            CrawlLease.lease_expires_at < now,
+            CrawlLease.attempts >= settings.worker_max_attempts,
+        )
+        .values(status="failed", lease_expires_at=None)
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    if result.rowcount:
+        logger.warning(f"任务 {job}: {result.rowcount} 个分片超过最大领取次数，标记为 failed")
+
+
+async def claim_shard(job: str, worker_id: str) -> CrawlLease | None:
+    """
+    领取一个分片
+
+    可领取的分片：pending 状态，或 running 但租约已过期（原 worker 已退出），
+    且领取次数未超过 worker_max_attempts。
+    用带条件的 UPDATE 做比较并交换，多个 worker 并发领取时只有一个能成功。
+    """
+    async with AsyncSessionLocal() as session:
+        now = _utcnow()
+        await _fail_exhausted(session, job, now)
+
+        claimable = and_(
+            or_(
+                CrawlLease.status == "pending",
+                and_(CrawlLease.status == "running", CrawlLease.lease_expires_at < now),
+            ),
+            CrawlLease.attempts < settings.worker_max_attempts,
+        )
+
+        stmt = (
+            select(CrawlLease.id)
+            .where(CrawlLease.job == job, claimable)
+            .order_by(CrawlLease.start_id)
+            .limit(10)
+        )
+        candidates = (await session.execute(stmt)).scalars().all()
+
+        for lease_id in candidates:
+            stmt = (
+                update(CrawlLease)
+                .where(CrawlLease.id == lease_id, claimable)
+                .values(
+                    status="running",
+                    worker_id=worker_id,
+                    heartbeat_at=now,
+                    lease_expires_at=now + timedelta(seconds=settings.worker_lease_seconds),
+                    attempts=CrawlLease.attempts + 1,
+                )
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+
+            if result.rowcount == 1:
+                lease = await session.get(CrawlLease, lease_id)
+                logger.info(
+                    f"{worker_id} 领取分片 [{lease.start_id}, {lease.end_id})，"
+                    f"第 {lease.attempts}/{settings.worker_max_attempts} 次"
+                )
+                return lease
+
+    return None
+
+
+async def heartbeat(lease_id: int, worker_id: str, cursor_id: int) -> bool:
+    """
+    续约并记录进度
+
+    返回 False 表示租约已被其他 worker 接管，当前 worker 应停止处理该分片。
+    """
+    now = _utcnow()
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            update(CrawlLease)
+            .where(
+                CrawlLease.id == lease_id,
+                CrawlLease.worker_id == worker_id,
+                CrawlLease.status == "running",
+            )
+            .values(
+                cursor_id=cursor_id,
+                heartbeat_at=now,
+                lease_expires_at=now + timedelta(seconds=settings.worker_lease_seconds),
+            )
+        )
+        result = await session.execute(stmt)
+        await session.commit()
+
+    return result.rowcount == 1
+
+
+async def finish_shard(lease_id: int, worker_id: str, cursor_id: int, done: bool) -> None:
+    """
+    结束分片：done=True 标记完成，否则归还分片供其他 worker 接着处理
+
+    领取次数已用尽的分片不再归还，直接标记为 failed。
+    """
+    if done:
+        status = "done"
+    else:
+        status = case(
+            (CrawlLease.attempts >= settings.worker_max_attempts, "failed"),
+            else_="pending",
+        )
+
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            update(CrawlLease)
+            .where(CrawlLease.id == lease_id, CrawlLease.worker_id == worker_id)
+            .values(
+                status=status,
+                cursor_id=cursor_id,
+                worker_id=worker_id if done else None,
+                lease_expires_at=None,
+            )
+        )
+        await session.execute(stmt)
+        await session.commit()
+
+        if not done:
+            lease = await session.get(CrawlLease, lease_id)
+            if lease is not None and lease.status == "failed":
+                logger.warning(
+                    f"分片 [{lease.start_id}, {lease.end_id}) 已领取 {lease.attempts} 次仍未完成，标记为 failed"
+                )
+
+
+class ShardWorker:
+    """分片爬取 worker（每个进程运行一个）"""
+
+    def __init__(self, job: str = BACKFILL_JOB, worker_id: str | None = None):
+        self.job = job
+        self.worker_id = worker_id or default_worker_id()
+        self.stats = {"shards": 0, "errors": 0, "items": 0, "added": 0, "updated": 0}
+
+    async def run(self, max_shards: int | None = None) -> dict:
+        """
+        循环领取并处理分片，直到没有可领取的分片
+
+        单个分片出错（抓取失败、写库冲突、数据库锁等）只记录日志，分片已归还，
+        worker 继续领取下一个；反复出错的分片由 worker_max_attempts 兜底标记为 failed。
+        """
+        with HNScraper() as scraper:
+            while max_shards is None or self.stats["shards"] < max_shards:
+                lease = await claim_shard(self.job, self.worker_id)
+                if lease is None:
+                    break
+                try:
+                    await self._process(scraper, lease)
+                except Exception:
+                    self.stats["errors"] += 1
+                    logger.exception(f"{self.worker_id} 处理分片 [{lease.start_id}, {lease.end_id}) 失败")
+
+        logger.info(f"{self.worker_id} 退出: {self.stats}")
+        return self.stats
+
+    async def _flush(self, scraper: HNScraper, batch: list[dict]) -> None:
+        """分类并写入一批故事，提交成功后再同步重试队列"""
+        if batch:
+            try:
+                added, updated = await save_to_database(scraper.classify_stories(batch))
+            except Exception:
+                # 这批没有入库，不能让其中重试成功的 ID 出队
+                scraper.succeeded.clear()
+                raise
+            self.stats["added"] += added
+            self.stats["updated"] += updated
+        batch.clear()
+
+        # 抓取失败的 item 进入重试队列，由之后的爬取处理
+        await flush_fetch_results(scraper)
+
+    async def _process(self, scraper: HNScraper, lease: CrawlLease) -> None:
+        """处理单个分片，从 cursor_id 断点续爬"""
+        cursor = lease.cursor_id
+        batch: list[dict] = []
+        last_beat = time.monotonic()
+        done = False
+
+        try:
+            for item_id in range(lease.cursor_id, lease.end_id):
+                story = scraper.parse_story(item_id, scraper.fetch_story_detail(item_id))
+                self.stats["items"] += 1
+                if story:
+                    batch.append(story)
+
+                if len(batch) >= settings.worker_batch_size:
+                    await self._flush(scraper, batch)
+                    cursor = item_id + 1
+
+                if time.monotonic() - last_beat >= settings.worker_heartbeat_interval:
+                    # 先落盘再推进 cursor，保证崩溃后不会漏数据
+                    await self._flush(scraper, batch)
+                    cursor = item_id + 1
+                    if not await heartbeat(lease.id, self.worker_id, cursor):
+                        logger.warning(f"{self.worker_id} 失去分片 [{lease.start_id}, {lease.end_id}) 的租约")
+                        return
+                    last_beat = time.monotonic()
+
+            await self._flush(scraper, batch)
+            cursor = lease.end_id
+            done = True
+            self.stats["shards"] += 1
+        finally:
+            await finish_shard(lease.id, self.worker_id, cursor, done)
+
+
+async def run_worker(job: str = BACKFILL_JOB, max_shards: int | None = None) -> dict:
+    """运行一个 worker 的入口函数"""
+    return await ShardWorker(job).run(max_shards=max_shards)
@@ -1,6 +1,6 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import {
   Table,
   Card,
@@ -26,7 +26,14 @@ import {
   SearchOutlined,
   FilterOutlined,
 } from '@ant-design/icons';
-import { fetchStories, fetchStats, triggerCrawl, type Story, type StatsResponse } from '@/lib/api';
+import {
+  fetchStories,
+  fetchStats,
+  subscribeStories,
+  triggerCrawl,
+  type Story,
+  type StatsResponse,
+} from '@/lib/api';
 
 const { Search } = Input;
 const { Link } = Typography;
@@ -46,6 +53,10 @@ export default function StoryList() {
     total: 0,
   });
 
+  // 实时推送回调中读取最新的分页和筛选条件
+  const viewRef = useRef({ pagination, searchText, minScore });
+  viewRef.current = { pagination, searchText, minScore };
+
   // Table 列定义
   const columns: TableProps<Story>['columns'] = [
     {
@@ -156,13 +167,7 @@ export default function StoryList() {
     try {
       setCrawling(true);
       await triggerCrawl();
-      message.success('爬取任务已启动，请稍后刷新查看新数据');
-
-      // 5 秒后刷新数据
-      setTimeout(() => {
-        loadStories(pagination.current, pagination.pageSize);
-        loadStats();
-      }, 5000);
+      message.success('爬取任务已启动，新数据会自动推送');
     } catch (error) {
       message.error('触发爬取失败');
       console.error(error);
@@ -211,6 +216,31 @@ export default function StoryList() {
     loadStats();
   }, []);
 
+  // 订阅实时推送：变化的故事原地更新，有新故事时重新加载当前页
+  useEffect(() => {
+    const reload = () => {
+      const { pagination, searchText, minScore } = viewRef.current;
+      loadStories(pagination.current, pagination.pageSize, searchText, minScore);
+      loadStats();
+    };
+
+    return subscribeStories({
+      onStories: ({ added, updated }) => {
+        const addedAi = added.filter((story) => story.is_ai_related);
+        if (addedAi.length > 0) {
+          message.info(`新增 ${addedAi.length} 个故事`);
+          reload();
+          return;
+        }
+
+        const updatedById = new Map(updated.map((story) => [story.id, story]));
+        setStories((prev) => prev.map((story) => updatedById.get(story.id) ?? story));
+      },
+      onDropped: reload,
+      onRefresh: reload,
+    });
+  }, []);
+
   return (
     <div>
       {/* 统计卡片 */}
@@ -9,11 +9,18 @@ export interface Story {
   hn_id: number;
   title: string;
   url: string | null;
+  canonical_url: string | null;
+  url_hash: string | null;
+  domain: string | null;
+  duplicate_of: number | null;
   author: string;
   score: number;
   comments_count: number;
+  hot_rank: number;
   posted_at: string;
   is_ai_related: boolean;
+  matched_keywords: string | null;
+  ai_score: number | null;
   hn_url: string;
   created_at: string;
   updated_at: string;
@@ -42,6 +49,12 @@ export async function fetchStories(params: {
   size?: number;
   ai_only?: boolean;
   min_score?: number;
+  sort?: 'hot' | 'new' | 'top';
+  since?: string;
+  until?: string;
+  min_ai_score?: number;
+  domain?: string;
+  collapse_duplicates?: boolean;
 }): Promise<StoriesResponse> {
   const queryParams = new URLSearchParams();
 
@@ -49,6 +62,12 @@ export async function fetchStories(params: {
   if (params.size) queryParams.append('size', params.size.toString());
   if (params.ai_only !== undefined) queryParams.append('ai_only', params.ai_only.toString());
   if (params.min_score) queryParams.append('min_score', params.min_score.toString());
+  if (params.sort) queryParams.append('sort', params.sort);
+  if (params.since) queryParams.append('since', params.since);
+  if (params.until) queryParams.append('until', params.until);
+  if (params.min_ai_score !== undefined) queryParams.append('min_ai_score', params.min_ai_score.toString());
+  if (params.domain) queryParams.append('domain', params.domain);
+  if (params.collapse_duplicates) queryParams.append('collapse_duplicates', 'true');
 
   const response = await fetch(`${API_BASE_URL}/api/stories?${queryParams}`);
 
@@ -72,6 +91,53 @@ export async function fetchStory(id: number): Promise<Story> {
   return response.json();
 }
 
+export interface DomainStats {
+  domain: string;
+  stories: number;
+  unique_urls: number;
+  total_score: number;
+  top_score: number;
+}
+
+/**
+ * 获取域名聚合
+ */
+export async function fetchDomains(params: { limit?: number; ai_only?: boolean } = {}): Promise<DomainStats[]> {
+  const queryParams = new URLSearchParams();
+
+  if (params.limit) queryParams.append('limit', params.limit.toString());
+  if (params.ai_only !== undefined) queryParams.append('ai_only', params.ai_only.toString());
+
+  const response = await fetch(`${API_BASE_URL}/api/domains?${queryParams}`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch domains: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+/**
+ * 批量获取故事（按请求顺序返回，可只取部分字段）
+ */
+export async function fetchStoriesBatch(params: {
+  ids: number[];
+  key?: 'id' | 'hn_id';
+  fields?: (keyof Story)[];
+}): Promise<{ items: Partial<Story>[]; missing: number[] }> {
+  const response = await fetch(`${API_BASE_URL}/api/stories/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(params),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch stories: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
 /**
  * 获取统计信息
  */
@@ -85,6 +151,34 @@ export async function fetchStats(): Promise<StatsResponse> {
   return response.json();
 }
 
+export interface StoriesEvent {
+  added: Story[];
+  updated: Story[];
+}
+
+/**
+ * 订阅新增/变化的故事（SSE 实时推送）
+ *
+ * 返回取消订阅函数。收到 dropped 表示消费过慢被服务端断开，
+ * EventSource 会自动重连，调用方应重新拉取列表；收到 refresh 表示
+ * 其他进程一次写入了太多变化，服务端不逐条推送，调用方同样应重新拉取列表。
+ */
+export function subscribeStories(handlers: {
+  onStories: (event: StoriesEvent) => void;
+  onDropped?: () => void;
+  onRefresh?: () => void;
+}): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/stories/stream`);
+
+  source.addEventListener('stories', (e) => {
+    handlers.onStories(JSON.parse((e as MessageEvent).data));
+  });
+  source.addEventListener('dropped', () => handlers.onDropped?.());
+  source.addEventListener('refresh', () => handlers.onRefresh?.());
+
+  return () => source.close();
+}
+
 /**
  * 触发爬取
  */
@@ -99,3 +193,44 @@ export async function triggerCrawl(): Promise<{ message: string; status: string
 
   return response.json();
 }
+
+export interface FailedFetch {
+  hn_id: number;
+  attempts: number;
+  last_error: string | null;
+  next_retry_at: string | null;
+  first_failed_at: string;
+  last_failed_at: string;
+}
+
+export interface CrawlFailuresResponse {
+  total: number;
+  due: number;
+  gave_up: number;
+  items: FailedFetch[];
+  page: number;
+  size: number;
+}
+
+/**
+ * 获取抓取失败重试队列
+ */
+export async function fetchCrawlFailures(params: {
+  page?: number;
+  size?: number;
+  due_only?: boolean;
+} = {}): Promise<CrawlFailuresResponse> {
+  const queryParams = new URLSearchParams();
+
+  if (params.page) queryParams.append('page', params.page.toString());
+  if (params.size) queryParams.append('size', params.size.toString());
+  if (params.due_only) queryParams.append('due_only', 'true');
+
+  const response = await fetch(`${API_BASE_URL}/api/crawl/failures?${queryParams}`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch crawl failures: ${response.statusText}`);
+  }
+
+  return response.json();
+}